@@ -1,13 +1,16 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView
+from django.db.models import Case, Count, Exists, OuterRef, Value, When
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
 
 from accounts.forms import SignUpForm, StyledAuthenticationForm
 from accounts.models import EmailVerificationToken, HostProfile
 from accounts.services import send_verification_email
+from core.pagination import paginate_keyset
 from notifications.models import UserNotification
 from reservations.models import Reservation
 
@@ -77,10 +80,52 @@ def host_dashboard(request):
     )
 
 
+HOST_INBOX_ORDERING = ["-created_at", "-id"]
+
+
 @login_required
 def host_reservations(request):
-    reservations = Reservation.objects.filter(host=request.user).select_related("listing", "guest")
-    return render(request, "accounts/host_reservations.html", {"reservations": reservations})
+    received = Reservation.objects.filter(host=request.user)
+    status_counts = dict(received.order_by().values_list("status").annotate(total=Count("pk")))
+    status = request.GET.get("status")
+    if status not in Reservation.Status.values:
+        status = None
+
+    # Flag pending requests whose dates overlap another pending or approved stay
+    # on the same listing: one correlated EXISTS per row in the page query.
+    overlapping = Reservation.objects.filter(
+        listing_id=OuterRef("listing_id"),
+        status__in=[Reservation.Status.REQUESTED, Reservation.Status.APPROVED],
+        stay__overlap=OuterRef("stay"),
+    ).exclude(pk=OuterRef("pk"))
+    inbox = (received.filter(status=status) if status else received).annotate(
+        has_conflict=Case(
+            When(status=Reservation.Status.REQUESTED, then=Exists(overlapping)),
+            default=Value(False),
+        )
+    )
+    page = paginate_keyset(
+        inbox.select_related("listing", "guest"),
+        HOST_INBOX_ORDERING,
+        cursor=request.GET.get("cursor"),
+        page_size=getattr(settings, "COVACH_HOST_INBOX_PAGE_SIZE", 25),
+    )
+    next_query = None
+    if page.has_next:
+        params = request.GET.copy()
+        params["cursor"] = page.next_cursor
+        next_query = params.urlencode()
+
+    context = {
+        "reservations": page.items,
+        "next_query": next_query,
+        "status": status,
+        "status_tabs": [
+            (value, label, status_counts.get(value, 0)) for value, label in Reservation.Status.choices
+        ],
+        "total_count": sum(status_counts.values()),
+    }
+    return render(request, "accounts/host_reservations.html", context)
 
 
 @login_required
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from core.instrumentation import enabled, install_query_timer
+
+        if enabled():
+            connection_created.connect(install_query_timer, dispatch_uid="covach_query_timer")
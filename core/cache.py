@@ -0,0 +1,53 @@
+import time
+
+from django.core.cache import cache
+
+
+def get_or_compute(key, compute, ttl, lock_timeout=30, wait=2.0, poll_interval=0.05):
+    """Return the cached value for ``key``, letting only one caller recompute it.
+
+    Entries are kept for twice ``ttl``: once stale, the caller that wins the
+    lock recomputes while everyone else keeps serving the stale copy. On a
+    cold miss the losers poll briefly for the winner's result before falling
+    back to computing it themselves.
+    """
+    entry = cache.get(key)
+    if entry is not None and entry["fresh_until"] > time.time():
+        return entry["value"]
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, timeout=lock_timeout):
+        try:
+            value = compute()
+            cache.set(key, {"value": value, "fresh_until": time.time() + ttl}, timeout=ttl * 2)
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        return entry["value"]
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry["value"]
+    return compute()
+
+
+def current_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old version.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+        return cache.get(key)
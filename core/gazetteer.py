@@ -0,0 +1,169 @@
+import re
+import unicodedata
+
+from django.contrib.gis.geos import Point, Polygon
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import CharField, F, Func, Q, Value
+
+from core.models import Place
+
+# Below this a fuzzy match is more likely a different town than a typo.
+FUZZY_MATCH_THRESHOLD = 0.5
+
+
+def normalize_place_name(value) -> str:
+    """Lowercase, strip accents and collapse whitespace around comma-separated parts."""
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(char for char in value if not unicodedata.combining(char)).lower()
+    parts = (" ".join(re.sub(r"[^\w\s-]", " ", part).split()) for part in value.split(","))
+    return ", ".join(part for part in parts if part)
+
+
+def _aliases(name, region, country):
+    combos = [(name, region), (name, country), (name, region, country)]
+    return sorted({normalize_place_name(", ".join(part for part in combo if part)) for combo in combos} - {""})
+
+
+def _result(place):
+    return {
+        "lat": place.centroid.y,
+        "lon": place.centroid.x,
+        "display_name": place.display_name or str(place),
+    }
+
+
+def _exact_places(normalized):
+    return Place.objects.filter(Q(normalized_name=normalized) | Q(aliases__contains=[normalized])).order_by(
+        "-weight", "pk"
+    )
+
+
+def _fuzzy_places(normalized):
+    name = normalized.split(",")[0]
+    return (
+        Place.objects.filter(normalized_name__trigram_similar=name)
+        .annotate(similarity=TrigramSimilarity("normalized_name", name))
+        .filter(similarity__gte=FUZZY_MATCH_THRESHOLD)
+        .order_by("-similarity", "-weight", "pk")
+    )
+
+
+def lookup_place(query):
+    """Resolve ``query`` against the gazetteer: exact name or alias first, then a trigram match."""
+    normalized = normalize_place_name(query)
+    if not normalized:
+        return None
+    place = _exact_places(normalized).first() or _fuzzy_places(normalized).first()
+    return _result(place) if place else None
+
+
+async def alookup_place(query):
+    normalized = normalize_place_name(query)
+    if not normalized:
+        return None
+    place = await _exact_places(normalized).afirst() or await _fuzzy_places(normalized).afirst()
+    return _result(place) if place else None
+
+
+def load_places(rows, source=Place.Source.IMPORT, update_fields=None, batch_size=500):
+    """Upsert gazetteer rows given as dicts with ``name``, ``lat`` and ``lon`` plus optional
+    ``region``, ``country``, ``aliases``, ``bbox`` (west, south, east, north) and ``weight``.
+    """
+    places = {}
+    for row in rows:
+        name, region, country = row["name"].strip(), row.get("region", "").strip(), row.get("country", "").strip()
+        normalized = normalize_place_name(name)
+        if not normalized:
+            continue
+        aliases = set(_aliases(name, region, country))
+        aliases.update(normalize_place_name(alias) for alias in row.get("aliases", ()))
+        aliases.discard("")
+        bbox = row.get("bbox")
+        places[(normalized, region, country)] = Place(
+            name=name,
+            normalized_name=normalized,
+            aliases=sorted(aliases),
+            region=region,
+            country=country,
+            display_name=row.get("display_name", ""),
+            centroid=Point(float(row["lon"]), float(row["lat"]), srid=4326),
+            bbox=Polygon.from_bbox(bbox) if bbox else None,
+            weight=row.get("weight", 0),
+            source=source,
+        )
+
+    Place.objects.bulk_create(
+        places.values(),
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["normalized_name", "region", "country"],
+        update_fields=update_fields or ["name", "aliases", "display_name", "centroid", "bbox", "weight", "source"],
+    )
+    return len(places)
+
+
+def places_from_listings():
+    """Yield one gazetteer row per distinct listing city, centred on its listings."""
+    from listings.models import Listing
+
+    cities = {}
+    listings = Listing.objects.filter(location__isnull=False).values_list("city", "region", "country", "location")
+    for city, region, country, location in listings.iterator(chunk_size=2000):
+        cities.setdefault((city, region, country), []).append((location.x, location.y))
+
+    for (city, region, country), points in cities.items():
+        lons, lats = [lon for lon, _ in points], [lat for _, lat in points]
+        bbox = (min(lons), min(lats), max(lons), max(lats))
+        yield {
+            "name": city,
+            "region": region,
+            "country": country,
+            "lat": sum(lats) / len(lats),
+            "lon": sum(lons) / len(lons),
+            "bbox": bbox if bbox[0] < bbox[2] and bbox[1] < bbox[3] else None,
+            "weight": len(points),
+        }
+
+
+def remember_place(query, match):
+    """Persist a Nominatim match (requested with ``addressdetails``) and alias it to ``query``."""
+    address = match.get("address", {})
+    name = (
+        address.get("city")
+        or address.get("town")
+        or address.get("village")
+        or match.get("name")
+        or match["display_name"].split(",")[0]
+    )
+    region, country = address.get("state", ""), address.get("country", "")
+    bbox = None
+    if match.get("boundingbox"):
+        south, north, west, east = (float(value) for value in match["boundingbox"])
+        if west < east and south < north:
+            bbox = Polygon.from_bbox((west, south, east, north))
+
+    place, created = Place.objects.get_or_create(
+        normalized_name=normalize_place_name(name),
+        region=region,
+        country=country,
+        defaults={
+            "name": name,
+            "aliases": _aliases(name, region, country),
+            "display_name": match["display_name"],
+            "centroid": Point(float(match["lon"]), float(match["lat"]), srid=4326),
+            "bbox": bbox,
+            "source": Place.Source.NOMINATIM,
+        },
+    )
+    alias = normalize_place_name(query)
+    if alias and alias != place.normalized_name and alias not in place.aliases:
+        Place.objects.filter(pk=place.pk).update(
+            aliases=Func(
+                F("aliases"),
+                Value(alias),
+                function="array_append",
+                output_field=ArrayField(CharField()),
+            )
+        )
+    return place
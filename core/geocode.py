@@ -1,55 +1,176 @@
 import hashlib
+import json
 import time
 from urllib.parse import urlencode
 from urllib.request import Request, urlopen
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.core.cache import cache
 
+from core.gazetteer import alookup_place, lookup_place, normalize_place_name, remember_place
+from core.instrumentation import timed
+
+# Cached in place of a result so a miss is not retried on every search.
+NOT_FOUND = {}
+NOT_FOUND_TTL = 60 * 60 * 6
+# Cached briefly after a failed call so an outage is not hammered.
+FAILED = {"failed": True}
+ERROR_TTL = 30
+FOUND_TTL = 60 * 60 * 24
+
+
+class _Unavailable:
+    """Falsy result for "the geocoder was skipped or failed", unlike ``None`` for "no such place"."""
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return "UNAVAILABLE"
+
+
+UNAVAILABLE = _Unavailable()
+
 
 class GeocodeRateLimiter:
     cache_key = "nominatim:last_call"
 
     @classmethod
-    def throttle(cls):
-        last = cache.get(cls.cache_key)
-        now = time.monotonic()
-        if last and now - last < 1:
-            time.sleep(1 - (now - last))
-        cache.set(cls.cache_key, time.monotonic(), timeout=2)
+    def acquire(cls) -> bool:
+        """Claim this second's single Nominatim call; never sleeps."""
+        return cache.add(cls.cache_key, time.monotonic(), timeout=1)
 
 
-def geocode_city(query: str):
-    query = (query or "").strip()
-    if not query:
-        return None
+class GeocodeCircuitBreaker:
+    """Stop calling Nominatim for a cool-down after repeated consecutive failures."""
+
+    failures_key = "nominatim:failures"
+    open_key = "nominatim:open"
+
+    @classmethod
+    def is_open(cls) -> bool:
+        return cache.get(cls.open_key) is not None
+
+    @classmethod
+    def record_failure(cls):
+        cache.add(cls.failures_key, 0, timeout=60)
+        try:
+            failures = cache.incr(cls.failures_key)
+        except ValueError:
+            failures = 1
+        if failures >= getattr(settings, "COVACH_GEOCODE_FAILURE_THRESHOLD", 5):
+            cache.set(cls.open_key, 1, timeout=getattr(settings, "COVACH_GEOCODE_COOLDOWN_SECONDS", 60))
+            cache.delete(cls.failures_key)
+
+    @classmethod
+    def record_success(cls):
+        cache.delete(cls.failures_key)
 
-    key = f"geocode:{hashlib.sha1(query.encode()).hexdigest()}"
-    cached = cache.get(key)
-    if cached:
-        return cached
 
-    GeocodeRateLimiter.throttle()
-    params = urlencode({"q": query, "format": "json", "limit": 1})
+def _fetch(query):
+    params = urlencode({"q": query, "format": "json", "limit": 1, "addressdetails": 1})
     request = Request(
         f"https://nominatim.openstreetmap.org/search?{params}",
         headers={"User-Agent": "CovachApp/1.0"},
     )
+    with urlopen(request, timeout=getattr(settings, "COVACH_GEOCODE_TIMEOUT", 2)) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def _from_cache(cached):
+    return UNAVAILABLE if cached == FAILED else cached or None
+
+
+def _wait_for(key, wait=1.0, poll_interval=0.05):
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        cached = cache.get(key)
+        if cached is not None:
+            return _from_cache(cached)
+    return UNAVAILABLE
+
+
+def _remote_geocode(query, normalized):
+    """Cached/coalesced Nominatim lookup; returns ``(result, match)``.
+
+    ``match`` is the raw Nominatim hit when this call fetched it, so the caller
+    can persist it in the gazetteer; it is ``None`` for cached answers.
+    """
+    key = f"geocode:{hashlib.sha1(normalized.encode()).hexdigest()}"
+    cached = cache.get(key)
+    if cached is not None:
+        return _from_cache(cached), None
+    if GeocodeCircuitBreaker.is_open():
+        return UNAVAILABLE, None
+
+    # One caller per query talks to Nominatim; concurrent ones wait briefly for its answer.
+    lock_key = f"{key}:lock"
+    if not cache.add(lock_key, 1, timeout=getattr(settings, "COVACH_GEOCODE_TIMEOUT", 2) + 1):
+        return _wait_for(key), None
     try:
-        with urlopen(request, timeout=5) as response:
-            payload = response.read().decode("utf-8")
-    except Exception:
+        if not GeocodeRateLimiter.acquire():
+            return UNAVAILABLE, None
+        try:
+            data = _fetch(query.strip())
+        except Exception:
+            GeocodeCircuitBreaker.record_failure()
+            cache.set(key, FAILED, timeout=ERROR_TTL)
+            return UNAVAILABLE, None
+        GeocodeCircuitBreaker.record_success()
+
+        if not data:
+            cache.set(key, NOT_FOUND, timeout=NOT_FOUND_TTL)
+            return None, None
+
+        result = {
+            "lat": float(data[0]["lat"]),
+            "lon": float(data[0]["lon"]),
+            "display_name": data[0]["display_name"],
+        }
+        cache.set(key, result, timeout=FOUND_TTL)
+        return result, data[0]
+    finally:
+        cache.delete(lock_key)
+
+
+def geocode_city(query: str):
+    """Return ``{"lat", "lon", "display_name"}`` for ``query``, ``None`` or ``UNAVAILABLE``.
+
+    ``UNAVAILABLE`` (also falsy) means the remote geocoder was rate limited,
+    tripped or failing: callers fall back to text search rather than holding
+    the request, but should not cache that degraded answer for long.
+    """
+    normalized = normalize_place_name(query)
+    if not normalized:
         return None
 
-    import json
+    with timed("geocode"):
+        local = lookup_place(normalized)
+        if local:
+            return local
+
+        result, match = _remote_geocode(query, normalized)
+        if match:
+            remember_place(query, match)
+        return result
 
-    data = json.loads(payload)
-    if not data:
+
+async def ageocode_city(query: str):
+    """Async ``geocode_city``: the remote call runs in a worker thread of its own,
+    so concurrent searches do not queue behind each other's HTTP round trips.
+    """
+    normalized = normalize_place_name(query)
+    if not normalized:
         return None
 
-    result = {
-        "lat": float(data[0]["lat"]),
-        "lon": float(data[0]["lon"]),
-        "display_name": data[0]["display_name"],
-    }
-    cache.set(key, result, timeout=60 * 60 * 24)
-    return result
+    with timed("geocode"):
+        local = await alookup_place(normalized)
+        if local:
+            return local
+
+        result, match = await sync_to_async(_remote_geocode, thread_sensitive=False)(query, normalized)
+        if match:
+            await sync_to_async(remember_place)(query, match)
+        return result
@@ -0,0 +1,143 @@
+"""Per-request timing of DB queries, template rendering, geocoding and email.
+
+Enabled with ``COVACH_SERVER_TIMING``. When off, the middleware removes itself
+and ``timed()`` / the query wrapper reduce to one ContextVar lookup.
+"""
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger("covach.timing")
+
+# {metric: [count, seconds]} for the request being served, or None outside one.
+_timings = ContextVar("covach_timings", default=None)
+
+
+def enabled() -> bool:
+    return getattr(settings, "COVACH_SERVER_TIMING", False)
+
+
+def record(metric, seconds):
+    timings = _timings.get()
+    if timings is None:
+        return
+    entry = timings.setdefault(metric, [0, 0.0])
+    entry[0] += 1
+    entry[1] += seconds
+
+
+@contextmanager
+def timed(metric):
+    if _timings.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(metric, time.perf_counter() - start)
+
+
+def query_timer(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` hook; installed on every new connection."""
+    if _timings.get() is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record("db", time.perf_counter() - start)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+class _TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed("tpl"):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates whose top-level renders count towards the ``tpl`` metric."""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return _TimedTemplate(template.template, self)
+
+
+def _server_timing(timings, total):
+    parts = []
+    for metric, (count, seconds) in timings.items():
+        parts.append(f'{metric};dur={seconds * 1000:.1f};desc="{count}x"')
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def _report(request, response, timings, total):
+    response["Server-Timing"] = _server_timing(timings, total)
+    match = getattr(request, "resolver_match", None)
+    logger.info(
+        json.dumps(
+            {
+                "view": match._func_path if match else None,
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "total_ms": round(total * 1000, 1),
+                **{
+                    metric: {"count": count, "ms": round(seconds * 1000, 1)}
+                    for metric, (count, seconds) in timings.items()
+                },
+            },
+            sort_keys=True,
+        )
+    )
+
+
+@sync_and_async_middleware
+def server_timing_middleware(get_response):
+    if not enabled():
+        raise MiddlewareNotUsed
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            timings = {}
+            token = _timings.set(timings)
+            start = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _timings.reset(token)
+            _report(request, response, timings, time.perf_counter() - start)
+            return response
+
+    else:
+
+        def middleware(request):
+            timings = {}
+            token = _timings.set(timings)
+            start = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _timings.reset(token)
+            _report(request, response, timings, time.perf_counter() - start)
+            return response
+
+    return middleware
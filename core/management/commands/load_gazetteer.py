@@ -0,0 +1,54 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.gazetteer import load_places, places_from_listings
+from core.models import Place
+
+BBOX_COLUMNS = ("west", "south", "east", "north")
+
+
+def _csv_rows(path):
+    with open(path, newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            bbox = None
+            if all(row.get(column) for column in BBOX_COLUMNS):
+                bbox = tuple(float(row[column]) for column in BBOX_COLUMNS)
+            yield {
+                "name": row["name"],
+                "region": row.get("region") or "",
+                "country": row.get("country") or "",
+                "lat": row["lat"],
+                "lon": row["lon"],
+                "aliases": [alias for alias in (row.get("aliases") or "").split("|") if alias],
+                "display_name": row.get("display_name") or "",
+                "bbox": bbox,
+                "weight": int(row.get("weight") or 0),
+            }
+
+
+class Command(BaseCommand):
+    help = "Load the local place gazetteer from a CSV dump and/or listing cities"
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", nargs="?", help="CSV with name,region,country,lat,lon columns")
+        parser.add_argument(
+            "--from-listings",
+            action="store_true",
+            help="Add one place per distinct listing city (existing places only get their weight updated)",
+        )
+
+    def handle(self, *args, **options):
+        if not options["csv_path"] and not options["from_listings"]:
+            raise CommandError("Pass a CSV path, --from-listings, or both")
+
+        if options["csv_path"]:
+            try:
+                total = load_places(_csv_rows(options["csv_path"]))
+            except (OSError, KeyError, ValueError) as exc:
+                raise CommandError(f"Could not load {options['csv_path']}: {exc}") from exc
+            self.stdout.write(self.style.SUCCESS(f"Loaded {total} places from {options['csv_path']}"))
+
+        if options["from_listings"]:
+            total = load_places(places_from_listings(), source=Place.Source.LISTINGS, update_fields=["weight"])
+            self.stdout.write(self.style.SUCCESS(f"Loaded {total} places from listing cities"))
@@ -137,6 +137,7 @@ class Command(BaseCommand):
                 amenity_objs = [amenity_map[n] for n in amenity_names if n in amenity_map]
                 if amenity_objs:
                     listing.amenities.set(amenity_objs)
+                    listing.sync_amenity_ids()
 
         self.stdout.write(self.style.SUCCESS(f"  {len(listing_map)} listings imported"))
 
@@ -187,6 +188,9 @@ class Command(BaseCommand):
             booking_guest = guest_user_cache[email]
 
             status = BOOKING_STATUS_MAP.get(booking["status"], "requested")
+            if status == "approved" and self._has_approved_overlap(listing, booking["check_in"], booking["check_out"]):
+                # Approved stays may not overlap (database exclusion constraint).
+                status = "declined"
             created_at = timezone.now()
 
             reservation, created = Reservation.objects.get_or_create(
@@ -223,7 +227,9 @@ class Command(BaseCommand):
                         "host": lst.host,
                         "guests": 2,
                         "total_usd": lst.nightly_rate_usd * 5,
-                        "status": "approved" if i == 0 else "requested",
+                        "status": "approved"
+                        if i == 0 and not self._has_approved_overlap(lst, "2026-03-15", "2026-03-20")
+                        else "requested",
                         "guest_message": "Looking forward to the stay!",
                         "expires_at": timezone.now() + timedelta(hours=48),
                     },
@@ -328,3 +334,11 @@ class Command(BaseCommand):
             or Amenity.objects.exists()
             or UserNotification.objects.exists()
         )
+
+    def _has_approved_overlap(self, listing, check_in, check_out):
+        return Reservation.objects.filter(
+            listing=listing,
+            status=Reservation.Status.APPROVED,
+            check_in__lt=check_out,
+            check_out__gt=check_in,
+        ).exists()
@@ -0,0 +1,62 @@
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_enable_postgis"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name="Place",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=160)),
+                ("normalized_name", models.CharField(max_length=160)),
+                (
+                    "aliases",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=255), blank=True, default=list, size=None
+                    ),
+                ),
+                ("region", models.CharField(blank=True, max_length=120)),
+                ("country", models.CharField(blank=True, max_length=120)),
+                ("display_name", models.CharField(blank=True, max_length=255)),
+                ("centroid", django.contrib.gis.db.models.fields.PointField(geography=True, srid=4326)),
+                (
+                    "bbox",
+                    django.contrib.gis.db.models.fields.PolygonField(blank=True, geography=True, null=True, srid=4326),
+                ),
+                ("weight", models.PositiveIntegerField(default=0)),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[("import", "Import"), ("listings", "Listings"), ("nominatim", "Nominatim")],
+                        default="import",
+                        max_length=20,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["normalized_name"],
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["normalized_name"], name="core_place_name_trgm", opclasses=["gin_trgm_ops"]
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(fields=["aliases"], name="core_place_aliases_8c33cb_gin"),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("normalized_name", "region", "country"), name="unique_place_name_region_country"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,13 @@
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_place"),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+    ]
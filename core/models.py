@@ -0,0 +1,39 @@
+from django.contrib.gis.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+
+
+class Place(models.Model):
+    """Local gazetteer entry so location search rarely needs a remote geocoder."""
+
+    class Source(models.TextChoices):
+        IMPORT = "import", "Import"
+        LISTINGS = "listings", "Listings"
+        NOMINATIM = "nominatim", "Nominatim"
+
+    name = models.CharField(max_length=160)
+    normalized_name = models.CharField(max_length=160)
+    # Normalized alternative spellings, e.g. "austin, tx" or a raw query that geocoded here.
+    aliases = ArrayField(models.CharField(max_length=255), default=list, blank=True)
+    region = models.CharField(max_length=120, blank=True)
+    country = models.CharField(max_length=120, blank=True)
+    display_name = models.CharField(max_length=255, blank=True)
+    centroid = models.PointField(geography=True)
+    bbox = models.PolygonField(geography=True, null=True, blank=True)
+    # Tie-breaker between equally named places; the listing count for seeded rows.
+    weight = models.PositiveIntegerField(default=0)
+    source = models.CharField(max_length=20, choices=Source.choices, default=Source.IMPORT)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["normalized_name", "region", "country"], name="unique_place_name_region_country"),
+        ]
+        indexes = [
+            GinIndex(fields=["normalized_name"], name="core_place_name_trgm", opclasses=["gin_trgm_ops"]),
+            GinIndex(fields=["aliases"]),
+        ]
+        ordering = ["normalized_name"]
+
+    def __str__(self) -> str:
+        return ", ".join(part for part in (self.name, self.region, self.country) if part)
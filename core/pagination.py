@@ -0,0 +1,67 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def _after(ordering, values):
+    # Row-value comparison expanded into OR-ed prefixes so each sort column can
+    # have its own direction: (a > x) OR (a = x AND b > y) OR ...
+    condition = Q()
+    for index, field in enumerate(ordering):
+        clause = Q(**{f"{field.lstrip('-')}__{'lt' if field.startswith('-') else 'gt'}": values[index]})
+        for previous, value in zip(ordering[:index], values[:index]):
+            clause &= Q(**{previous.lstrip("-"): value})
+        condition |= clause
+    return condition
+
+
+def paginate_keyset(queryset, ordering, cursor=None, page_size=20) -> KeysetPage:
+    """Fetch one page ordered by ``ordering``, which must end in a unique column."""
+    values = decode_cursor(cursor, len(ordering))
+    queryset = queryset.order_by(*ordering)
+    if values is not None:
+        queryset = queryset.filter(_after(ordering, values))
+
+    items = list(queryset[: page_size + 1])
+    if len(items) <= page_size:
+        return KeysetPage(items)
+
+    items = items[:page_size]
+    last = items[-1]
+    return KeysetPage(items, encode_cursor(getattr(last, field.lstrip("-")) for field in ordering))
+
+
+def bounded_count(queryset, limit):
+    """Count at most ``limit`` rows; returns ``(count, capped)``."""
+    count = queryset.order_by().values("pk")[: limit + 1].count()
+    return min(count, limit), count > limit
@@ -31,6 +31,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.instrumentation.server_timing_middleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -45,7 +46,7 @@ ROOT_URLCONF = "covach.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.instrumentation.TimedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -71,10 +72,12 @@ DATABASES = {
     )
 }
 
+# Search invalidation and geocode single-flight rely on the cache being shared
+# between workers; point CACHE_BACKEND at memcached/redis outside development.
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "covach-cache",
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "covach-cache"),
     }
 }
 
@@ -130,6 +133,24 @@ EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
 HTMX_USE_HYPERSCRIPT = False
 
 COVACH_RESERVATION_REQUEST_TTL_HOURS = int(os.getenv("COVACH_RESERVATION_REQUEST_TTL_HOURS", "24"))
+COVACH_SEARCH_PAGE_SIZE = int(os.getenv("COVACH_SEARCH_PAGE_SIZE", "20"))
+COVACH_HOST_INBOX_PAGE_SIZE = int(os.getenv("COVACH_HOST_INBOX_PAGE_SIZE", "25"))
+COVACH_OCCUPANCY_HORIZON_DAYS = int(os.getenv("COVACH_OCCUPANCY_HORIZON_DAYS", "365"))
+COVACH_SEARCH_COUNT_LIMIT = int(os.getenv("COVACH_SEARCH_COUNT_LIMIT", "1000"))
+COVACH_SEARCH_CACHE_TTL = int(os.getenv("COVACH_SEARCH_CACHE_TTL", "60"))
+COVACH_CALENDAR_CACHE_TTL = int(os.getenv("COVACH_CALENDAR_CACHE_TTL", "300"))
+COVACH_GEOCODE_TIMEOUT = float(os.getenv("COVACH_GEOCODE_TIMEOUT", "2"))
+COVACH_GEOCODE_FAILURE_THRESHOLD = int(os.getenv("COVACH_GEOCODE_FAILURE_THRESHOLD", "5"))
+COVACH_GEOCODE_COOLDOWN_SECONDS = int(os.getenv("COVACH_GEOCODE_COOLDOWN_SECONDS", "60"))
+# Server-Timing headers plus one JSON log line per request on the "covach.timing" logger.
+COVACH_SERVER_TIMING = os.getenv("COVACH_SERVER_TIMING", "0") == "1"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {"covach.timing": {"handlers": ["console"], "level": "INFO"}},
+}
 
 GDAL_LIBRARY_PATH = os.getenv("GDAL_LIBRARY_PATH") or ctypes.util.find_library("gdal")
 GEOS_LIBRARY_PATH = os.getenv("GEOS_LIBRARY_PATH") or ctypes.util.find_library("geos_c")
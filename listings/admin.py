@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.db import transaction
 
-from listings.models import Amenity, AvailabilityBlock, Listing, ListingPhoto
+from listings.models import Amenity, AvailabilityBlock, AvailabilityRule, Listing, ListingPhoto
+from listings.occupancy import refresh_listing_occupancy
 
 
 class ListingPhotoInline(admin.TabularInline):
@@ -15,7 +17,35 @@ class ListingAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("title",)}
     inlines = [ListingPhotoInline]
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.sync_amenity_ids()
+
+
+@admin.register(AvailabilityBlock)
+class AvailabilityBlockAdmin(admin.ModelAdmin):
+    list_display = ("listing", "start_date", "end_date", "reason")
+
+    def delete_queryset(self, request, queryset):
+        # Bulk deletes bypass AvailabilityBlock.delete(), so refresh the calendars here.
+        with transaction.atomic():
+            listing_ids = set(queryset.values_list("listing_id", flat=True))
+            super().delete_queryset(request, queryset)
+            for listing_id in listing_ids:
+                refresh_listing_occupancy(listing_id)
+
+
+@admin.register(AvailabilityRule)
+class AvailabilityRuleAdmin(admin.ModelAdmin):
+    list_display = ("listing", "weekday_mask", "start_date", "end_date", "reason")
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            listing_ids = set(queryset.values_list("listing_id", flat=True))
+            super().delete_queryset(request, queryset)
+            for listing_id in listing_ids:
+                refresh_listing_occupancy(listing_id)
+
 
 admin.site.register(Amenity)
-admin.site.register(AvailabilityBlock)
 admin.site.register(ListingPhoto)
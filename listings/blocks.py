@@ -0,0 +1,93 @@
+from django.db import transaction
+from django.db.models import Count, Q
+
+from listings.calendar import availability_changed
+from listings.models import AvailabilityBlock, Listing
+from listings.occupancy import refresh_listing_occupancy
+from search.services import invalidate_search_cache
+
+REASON_MAX_LENGTH = AvailabilityBlock._meta.get_field("reason").max_length
+
+
+def coalesce(ranges):
+    """Merge overlapping and adjacent ``(start, end)`` ranges into sorted, disjoint ones."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def after_bulk_block_change(listing_id, start=None, end=None):
+    """Do what AvailabilityBlock's save hooks would have; call inside the transaction of a bulk write."""
+    refresh_listing_occupancy(listing_id, start, end)
+    availability_changed(listing_id)
+    transaction.on_commit(invalidate_search_cache)
+
+
+def _merged_reason(reasons):
+    distinct = list(dict.fromkeys(reason for reason in reasons if reason))
+    return "; ".join(distinct)[:REASON_MAX_LENGTH]
+
+
+def block_dates(listing, ranges, reason=""):
+    """Block ``ranges`` on ``listing``, rewriting its blocks as the fewest disjoint intervals.
+
+    Existing blocks that overlap or touch the result are replaced in one
+    transaction with one bulk insert and one delete; an interval that already
+    has exactly one block is left alone. Imported blocks keep their UIDs for
+    the next iCal sync, so they are not merged. Returns ``(created, deleted)``.
+    """
+    with transaction.atomic():
+        # Serialize edits to one listing so two editors cannot both add overlapping rows.
+        Listing.objects.select_for_update().only("pk").get(pk=listing.pk)
+        existing = list(AvailabilityBlock.objects.filter(listing=listing, external_uid="").order_by("start_date", "end_date", "pk"))
+        parts = [(block.start_date, block.end_date, block.reason, block) for block in existing]
+        parts += [(start, end, reason, None) for start, end in ranges]
+        parts.sort(key=lambda part: part[:2])
+        intervals = coalesce(part[:2] for part in parts)
+
+        created, deleted = [], []
+        position = 0
+        for start, end in intervals:
+            # Intervals are sorted and separated by gaps, so each one owns the
+            # next run of sorted parts that start before the gap after it.
+            first = position
+            while position < len(parts) and parts[position][0] <= end:
+                position += 1
+            members = [(why, block) for _, _, why, block in parts[first:position]]
+            blocks = [block for _, block in members if block is not None]
+            kept = next((block for block in blocks if (block.start_date, block.end_date) == (start, end)), None)
+            deleted += [block.pk for block in blocks if block is not kept]
+            if kept is None:
+                created.append(
+                    AvailabilityBlock(listing=listing, start_date=start, end_date=end, reason=_merged_reason(why for why, _ in members))
+                )
+
+        if not (created or deleted):
+            return 0, 0
+        # Bulk writes skip AvailabilityBlock.save()/delete(); after_bulk_block_change
+        # refreshes occupancy and the iCal ETag for these rows instead.
+        AvailabilityBlock.objects.filter(pk__in=deleted).delete()
+        AvailabilityBlock.objects.bulk_create(created)
+        after_bulk_block_change(listing.pk, intervals[0][0], intervals[-1][1])
+    return len(created), len(deleted)
+
+
+def compact_blocks(listing_ids=None):
+    """Coalesce the blocks of every listing that has more than one; returns ``(listings, created, deleted)``."""
+    listings = Listing.objects.annotate(block_count=Count("availability_blocks", filter=Q(availability_blocks__external_uid=""))).filter(
+        block_count__gt=1
+    )
+    if listing_ids:
+        listings = listings.filter(pk__in=listing_ids)
+
+    changed = created = deleted = 0
+    for listing in listings.order_by("pk").iterator():
+        listing_created, listing_deleted = block_dates(listing, [])
+        changed += bool(listing_created or listing_deleted)
+        created += listing_created
+        deleted += listing_deleted
+    return changed, created, deleted
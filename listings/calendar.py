@@ -0,0 +1,115 @@
+import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.cache import bump_version, current_version, get_or_compute
+from listings.models import AvailabilityBlock, Listing
+from listings.rules import rule_nights_sql
+from reservations.models import Reservation
+
+FREE, BOOKED = "0", "1"
+# Months further than this from today fall back to the current month.
+MAX_YEARS_AWAY = 10
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def month_window(month):
+    """``[first day, first day of next month)`` for the month containing ``month``."""
+    start = month_start(month)
+    end = (start + datetime.timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def parse_month(raw):
+    """``YYYY-MM`` to the first of that month; the current month when missing, malformed or out of range."""
+    current = month_start(timezone.localdate())
+    try:
+        month = datetime.datetime.strptime(raw or "", "%Y-%m").date()
+    except ValueError:
+        return current
+    if abs(month.year - current.year) > MAX_YEARS_AWAY:
+        return current
+    return month
+
+
+def unavailable_ranges(listing_id, start, end):
+    """Disjoint ``(start, end)`` ranges in ``[start, end)`` covered by blocks, rules or approved stays.
+
+    range_agg merges overlapping and adjacent spans, so back-to-back blocks
+    and consecutive rule nights come out as one range.
+    """
+    blocks = AvailabilityBlock._meta.db_table
+    reservations = Reservation._meta.db_table
+    rule_nights, rule_params = rule_nights_sql("%s", start, end)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT lower(busy.span), upper(busy.span)
+            FROM unnest(
+                (
+                    SELECT range_agg(spans.span * daterange(%s, %s))
+                    FROM (
+                        SELECT span FROM {blocks}
+                        WHERE listing_id = %s AND span && daterange(%s, %s)
+                        UNION ALL
+                        SELECT stay FROM {reservations}
+                        WHERE listing_id = %s AND status = %s AND stay && daterange(%s, %s)
+                        UNION ALL
+                        {rule_nights}
+                    ) spans
+                )
+            ) AS busy(span)
+            ORDER BY 1
+            """,
+            [start, end, listing_id, start, end, listing_id, Reservation.Status.APPROVED, start, end, listing_id, *rule_params],
+        )
+        return cursor.fetchall()
+
+
+def day_string(start, end, ranges):
+    """One character per night in ``[start, end)``: ``1`` unavailable, ``0`` free."""
+    days = [FREE] * (end - start).days
+    for range_start, range_end in ranges:
+        for offset in range((range_start - start).days, (range_end - start).days):
+            days[offset] = BOOKED
+    return "".join(days)
+
+
+def _version_key(listing_id):
+    return f"listings:calendar:{listing_id}:version"
+
+
+def invalidate_listing_calendar(listing_id):
+    bump_version(_version_key(listing_id))
+
+
+def availability_changed(listing_id):
+    """Stamp the listing's ``availability_updated_at`` and drop its cached months on commit.
+
+    Call from the transaction that changes a block or an approved stay.
+    """
+    Listing.objects.filter(pk=listing_id).update(availability_updated_at=timezone.now())
+    transaction.on_commit(lambda: invalidate_listing_calendar(listing_id))
+
+
+def month_calendar(listing_id, month):
+    """Cached availability of one listing for the month containing ``month``."""
+    start, end = month_window(month)
+    key = f"listings:calendar:{listing_id}:{current_version(_version_key(listing_id))}:{start:%Y-%m}"
+
+    def compute():
+        ranges = unavailable_ranges(listing_id, start, end)
+        return {
+            "month": f"{start:%Y-%m}",
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "unavailable": [[range_start.isoformat(), range_end.isoformat()] for range_start, range_end in ranges],
+            "days": day_string(start, end, ranges),
+        }
+
+    return get_or_compute(key, compute, ttl=getattr(settings, "COVACH_CALENDAR_CACHE_TTL", 300))
@@ -1,7 +1,9 @@
+import datetime
+
 from django import forms
 from django.contrib.gis.geos import Point
 
-from listings.models import AvailabilityBlock, Listing, ListingPhoto
+from listings.models import AvailabilityBlock, AvailabilityRule, Listing, ListingPhoto
 
 _input = "form-input"
 _select = "form-select"
@@ -66,16 +68,101 @@ class ListingForm(forms.ModelForm):
             self.save_m2m()
         return instance
 
+    def _save_m2m(self):
+        super()._save_m2m()
+        self.instance.sync_amenity_ids()
+
+
+class _RangeListField(forms.CharField):
+    """One range per line: ``YYYY-MM-DD`` for a single night or ``YYYY-MM-DD YYYY-MM-DD`` (end exclusive)."""
+
+    def to_python(self, value):
+        ranges = []
+        for number, line in enumerate(super().to_python(value).splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                dates = [datetime.date.fromisoformat(part) for part in line.replace(" to ", " ").split()]
+            except ValueError:
+                raise forms.ValidationError(f"Line {number}: use YYYY-MM-DD or YYYY-MM-DD YYYY-MM-DD.") from None
+            if len(dates) == 1:
+                dates.append(dates[0] + datetime.timedelta(days=1))
+            if len(dates) != 2 or dates[1] <= dates[0]:
+                raise forms.ValidationError(f"Line {number}: the end date must come after the start date.")
+            ranges.append(tuple(dates))
+        return ranges
+
+
+class _DateListField(forms.Field):
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        try:
+            return sorted({datetime.date.fromisoformat(item) for item in value or []})
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Invalid date selection.") from None
+
+
+class AvailabilityBlocksForm(forms.Form):
+    """Date ranges typed in and/or nights picked on the calendar, blocked in one go."""
+
+    MAX_RANGES = 100
+
+    ranges = _RangeListField(
+        required=False,
+        widget=forms.Textarea(attrs={"class": _textarea, "rows": 3, "placeholder": "2025-07-01 2025-07-05\n2025-07-12"}),
+    )
+    nights = _DateListField(required=False)
+    reason = forms.CharField(
+        required=False,
+        max_length=AvailabilityBlock._meta.get_field("reason").max_length,
+        widget=forms.TextInput(attrs={"class": _input, "placeholder": "Optional reason"}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        one_night = datetime.timedelta(days=1)
+        spans = list(cleaned_data.get("ranges") or [])
+        spans += [(night, night + one_night) for night in cleaned_data.get("nights") or []]
+        if not spans and not self.errors:
+            raise forms.ValidationError("Enter a date range or pick nights on the calendar.")
+        if len(spans) > self.MAX_RANGES:
+            raise forms.ValidationError(f"Block at most {self.MAX_RANGES} ranges at a time.")
+        cleaned_data["spans"] = spans
+        return cleaned_data
+
+
+class AvailabilityRuleForm(forms.ModelForm):
+    weekdays = forms.TypedMultipleChoiceField(
+        choices=list(enumerate(AvailabilityRule.WEEKDAYS)),
+        coerce=int,
+        widget=forms.CheckboxSelectMultiple,
+    )
 
-class AvailabilityBlockForm(forms.ModelForm):
     class Meta:
-        model = AvailabilityBlock
-        fields = ["start_date", "end_date", "reason"]
+        model = AvailabilityRule
+        fields = ["start_date", "end_date", "exclusions", "reason"]
         widgets = {
             "start_date": forms.DateInput(attrs={"class": _input, "type": "date"}),
             "end_date": forms.DateInput(attrs={"class": _input, "type": "date"}),
             "reason": forms.TextInput(attrs={"class": _input, "placeholder": "Optional reason"}),
         }
+        help_texts = {"exclusions": "Dates to keep open, comma separated (YYYY-MM-DD)."}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["exclusions"].widget.attrs["class"] = _input
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get("start_date"), cleaned_data.get("end_date")
+        if start and end and end <= start:
+            self.add_error("end_date", "The end date must come after the start date.")
+        return cleaned_data
+
+    def save(self, commit=True):
+        self.instance.weekday_mask = sum(1 << weekday for weekday in self.cleaned_data["weekdays"])
+        return super().save(commit)
 
 
 class ListingPhotoForm(forms.ModelForm):
@@ -0,0 +1,161 @@
+"""iCal (RFC 5545) export of a listing's unavailable dates and import of a channel's feed as blocks."""
+
+import datetime
+import re
+from typing import NamedTuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from listings.blocks import after_bulk_block_change
+from listings.models import AvailabilityBlock
+from listings.occupancy import searchable_window
+from listings.rules import mask_runs, overlapping_rules, rule_mask
+from reservations.models import Reservation
+
+PRODID = "-//Covach//Availability//EN"
+UID_DOMAIN = "covach"
+REASON_MAX_LENGTH = AvailabilityBlock._meta.get_field("reason").max_length
+
+
+class Event(NamedTuple):
+    uid: str
+    start: datetime.date
+    end: datetime.date
+    summary: str
+
+
+class ImportResult(NamedTuple):
+    created: int
+    updated: int
+    deleted: int
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _unescape(text):
+    return re.sub(r"\\([\\;,nN])", lambda match: "\n" if match.group(1) in "nN" else match.group(1), text)
+
+
+def _fold(line):
+    # Content lines are limited to 75 octets; continuations start with a space.
+    chunks, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > 75:
+            chunks.append(current)
+            current, size = " ", 1
+        current += char
+        size += width
+    chunks.append(current)
+    return "\r\n".join(chunks)
+
+
+def listing_events(listing, since):
+    """Blocks, rule-closed nights and approved stays of ``listing`` that end after ``since``.
+
+    Open-ended rules are expanded up to the search horizon, one event per run
+    of consecutive closed nights.
+    """
+    events = [
+        Event(f"block-{pk}@{UID_DOMAIN}", start, end, reason or "Not available")
+        for pk, start, end, reason in AvailabilityBlock.objects.filter(listing=listing, end_date__gt=since).values_list(
+            "pk", "start_date", "end_date", "reason"
+        )
+    ]
+    events += [
+        Event(f"reservation-{pk}@{UID_DOMAIN}", start, end, "Reserved")
+        for pk, start, end in Reservation.objects.filter(
+            listing=listing, status=Reservation.Status.APPROVED, check_out__gt=since
+        ).values_list("pk", "check_in", "check_out")
+    ]
+    _, horizon = searchable_window()
+    for rule in overlapping_rules([listing.pk], since, horizon):
+        events += [
+            Event(f"rule-{rule.pk}-{start:%Y%m%d}@{UID_DOMAIN}", start, end, rule.reason or "Not available")
+            for start, end in mask_runs(rule_mask(rule, since, horizon), since)
+        ]
+    return sorted(events, key=lambda event: (event.start, event.uid))
+
+
+def export_calendar(listing, since=None):
+    since = since or timezone.localdate()
+    stamp = (listing.availability_updated_at or listing.created_at).astimezone(datetime.timezone.utc)
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN", f"X-WR-CALNAME:{_escape(listing.title)}"]
+    for event in listing_events(listing, since):
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{event.uid}",
+            f"DTSTAMP:{stamp:%Y%m%dT%H%M%SZ}",
+            f"DTSTART;VALUE=DATE:{event.start:%Y%m%d}",
+            f"DTEND;VALUE=DATE:{event.end:%Y%m%d}",
+            f"SUMMARY:{_escape(event.summary)}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "".join(f"{_fold(line)}\r\n" for line in lines)
+
+
+def _parse_date(value):
+    # DATE or DATE-TIME; a stay is counted by the nights it covers, so the time is dropped.
+    return datetime.datetime.strptime(value[:8], "%Y%m%d").date()
+
+
+def parse_events(text):
+    """Events of an iCal document; cancelled and undated events are skipped."""
+    events, current = [], None
+    for line in re.sub(r"\r?\n[ \t]", "", text).splitlines():
+        head, _, value = line.partition(":")
+        name = head.split(";", 1)[0].upper()
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            current = {}
+        elif name == "END" and value.upper() == "VEVENT" and current is not None:
+            event, current = current, None
+            if "UID" not in event or "DTSTART" not in event or event.get("STATUS", "").upper() == "CANCELLED":
+                continue
+            try:
+                start = _parse_date(event["DTSTART"])
+                end = _parse_date(event["DTEND"]) if "DTEND" in event else start + datetime.timedelta(days=1)
+            except ValueError:
+                continue
+            if end > start:
+                events.append(Event(event["UID"], start, end, _unescape(event.get("SUMMARY", ""))))
+        elif current is not None:
+            current[name] = value.strip()
+    return events
+
+
+def import_calendar(listing, text, today=None):
+    """Sync the blocks imported into ``listing`` with an iCal feed, touching only what changed.
+
+    Events are matched to blocks by UID: new ones are bulk-created, moved or
+    renamed ones bulk-updated, and upcoming blocks whose event disappeared are
+    deleted. Past blocks are kept since feeds usually drop finished events.
+    """
+    today = today or timezone.localdate()
+    incoming = {event.uid: event for event in parse_events(text) if event.end > today}
+    existing = {block.external_uid: block for block in AvailabilityBlock.objects.filter(listing=listing).exclude(external_uid="")}
+
+    created, updated = [], []
+    for uid, event in incoming.items():
+        reason = event.summary[:REASON_MAX_LENGTH]
+        block = existing.get(uid)
+        if block is None:
+            created.append(
+                AvailabilityBlock(listing=listing, start_date=event.start, end_date=event.end, reason=reason, external_uid=uid)
+            )
+        elif (block.start_date, block.end_date, block.reason) != (event.start, event.end, reason):
+            block.start_date, block.end_date, block.reason = event.start, event.end, reason
+            updated.append(block)
+    deleted = [block.pk for uid, block in existing.items() if uid not in incoming and block.end_date > today]
+
+    if not (created or updated or deleted):
+        return ImportResult(0, 0, 0)
+    with transaction.atomic():
+        AvailabilityBlock.objects.filter(pk__in=deleted).delete()
+        AvailabilityBlock.objects.bulk_create(created)
+        AvailabilityBlock.objects.bulk_update(updated, ["start_date", "end_date", "reason"])
+        after_bulk_block_change(listing.pk)
+    return ImportResult(len(created), len(updated), len(deleted))
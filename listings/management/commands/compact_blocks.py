@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from listings.blocks import compact_blocks
+
+
+class Command(BaseCommand):
+    help = "Merge overlapping and adjacent availability blocks into the fewest rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listing", type=int, action="append", dest="listing_ids", help="Only this listing (repeatable)")
+
+    def handle(self, *args, **options):
+        listings, created, deleted = compact_blocks(options["listing_ids"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Compacted {listings} listings: replaced {deleted} blocks with {created}")
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.ical import import_calendar
+from listings.models import Listing
+
+
+class Command(BaseCommand):
+    help = "Sync a listing's imported availability blocks with an iCal (.ics) file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("listing_id", type=int)
+        parser.add_argument("ics_path", help="Path to the .ics file exported by the other channel")
+
+    def handle(self, *args, **options):
+        try:
+            listing = Listing.objects.get(pk=options["listing_id"])
+        except Listing.DoesNotExist as exc:
+            raise CommandError(f"Listing {options['listing_id']} does not exist") from exc
+        try:
+            with open(options["ics_path"], encoding="utf-8") as handle:
+                text = handle.read()
+        except OSError as exc:
+            raise CommandError(str(exc)) from exc
+
+        result = import_calendar(listing, text)
+        self.stdout.write(
+            self.style.SUCCESS(f"Created {result.created}, updated {result.updated}, deleted {result.deleted} blocks")
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.occupancy import rebuild_occupancy, verify_occupancy
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the per-night occupancy calendar used by date search"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only compare stored nights with blocks and approved reservations",
+        )
+
+    def handle(self, *args, **options):
+        if not options["verify"]:
+            total = rebuild_occupancy()
+            self.stdout.write(self.style.SUCCESS(f"Stored {total} occupied nights"))
+            return
+
+        drift = verify_occupancy()
+        for listing_id, (missing, unexpected) in sorted(drift.items()):
+            self.stdout.write(f"Listing {listing_id}: {len(missing)} missing, {len(unexpected)} unexpected nights")
+        if drift:
+            raise CommandError(f"Occupancy calendar drifted for {len(drift)} listings")
+        self.stdout.write(self.style.SUCCESS("Occupancy calendar is up to date"))
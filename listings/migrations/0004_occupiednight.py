@@ -0,0 +1,34 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0003_add_image_url_to_listingphoto"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OccupiedNight",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("night", models.DateField()),
+                (
+                    "listing",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="occupied_nights",
+                        to="listings.listing",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["listing", "night"],
+                "indexes": [models.Index(fields=["night", "listing"], name="listings_oc_night_95dfe8_idx")],
+                "constraints": [
+                    models.UniqueConstraint(fields=("listing", "night"), name="unique_listing_occupied_night")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def populate_search_vector(apps, schema_editor):
+    Listing = apps.get_model("listings", "Listing")
+    Listing.objects.update(
+        search_vector=SearchVector("title", weight="A", config="english")
+        + SearchVector("city", weight="B", config="english")
+        + SearchVector("description", weight="C", config="english")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0004_occupiednight"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listing",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=django.contrib.postgres.indexes.GinIndex(fields=["search_vector"], name="listings_li_search__219da8_gin"),
+        ),
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0005_listing_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(fields=["status", "nightly_rate_usd", "id"], name="listings_li_status_aa806c_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(fields=["status", "created_at", "id"], name="listings_li_status_8c8117_idx"),
+        ),
+    ]
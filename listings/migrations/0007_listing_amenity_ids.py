@@ -0,0 +1,34 @@
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db import migrations, models
+from django.db.models import OuterRef
+
+
+def populate_amenity_ids(apps, schema_editor):
+    Listing = apps.get_model("listings", "Listing")
+    through = Listing.amenities.through
+    amenity_ids = through.objects.filter(listing_id=OuterRef("pk")).order_by("amenity_id").values("amenity_id")
+    Listing.objects.update(amenity_ids=ArraySubquery(amenity_ids))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0006_listing_sort_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listing",
+            name="amenity_ids",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.BigIntegerField(), blank=True, default=list, editable=False, size=None
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=django.contrib.postgres.indexes.GinIndex(fields=["amenity_ids"], name="listings_li_amenity_d3332f_gin"),
+        ),
+        migrations.RunPython(populate_amenity_ids, migrations.RunPython.noop),
+    ]
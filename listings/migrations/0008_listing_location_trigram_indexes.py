@@ -0,0 +1,25 @@
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_place"),
+        ("listings", "0007_listing_amenity_ids"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="listing",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["city"], name="listings_city_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["region"], name="listings_region_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+    ]
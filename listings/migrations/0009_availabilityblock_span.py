@@ -0,0 +1,35 @@
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_btree_gist"),
+        ("listings", "0008_listing_location_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="availabilityblock",
+            name="span",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.expressions.Func(
+                    models.F("start_date"),
+                    models.F("end_date"),
+                    function="daterange",
+                    output_field=django.contrib.postgres.fields.ranges.DateRangeField(),
+                ),
+                output_field=django.contrib.postgres.fields.ranges.DateRangeField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="availabilityblock",
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=["listing", "span"], name="listings_av_listing_f479d3_gist"
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0009_availabilityblock_span"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listing",
+            name="availability_updated_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="availabilityblock",
+            name="external_uid",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddConstraint(
+            model_name="availabilityblock",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("external_uid", ""), _negated=True),
+                fields=("listing", "external_uid"),
+                name="unique_block_external_uid",
+            ),
+        ),
+    ]
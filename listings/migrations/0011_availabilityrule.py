@@ -0,0 +1,67 @@
+import django.contrib.postgres.fields
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0010_ical_sync"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AvailabilityRule",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("weekday_mask", models.PositiveSmallIntegerField()),
+                ("start_date", models.DateField()),
+                ("end_date", models.DateField(blank=True, null=True)),
+                (
+                    "span",
+                    models.GeneratedField(
+                        db_persist=True,
+                        expression=django.db.models.expressions.Func(
+                            models.F("start_date"),
+                            models.F("end_date"),
+                            function="daterange",
+                            output_field=django.contrib.postgres.fields.ranges.DateRangeField(),
+                        ),
+                        output_field=django.contrib.postgres.fields.ranges.DateRangeField(),
+                    ),
+                ),
+                (
+                    "exclusions",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.DateField(), blank=True, default=list, size=None
+                    ),
+                ),
+                ("reason", models.CharField(blank=True, max_length=120)),
+                (
+                    "listing",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="availability_rules",
+                        to="listings.listing",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["start_date"],
+                "indexes": [
+                    django.contrib.postgres.indexes.GistIndex(
+                        fields=["listing", "span"], name="listings_av_listing_8fbda5_gist"
+                    )
+                ],
+                "constraints": [
+                    models.CheckConstraint(
+                        condition=models.Q(("weekday_mask__gt", 0), ("weekday_mask__lt", 128)),
+                        name="availability_rule_weekday_mask_range",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+import listings.models
+
+
+def fill_tokens(apps, schema_editor):
+    Listing = apps.get_model("listings", "Listing")
+    for listing in Listing.objects.filter(ical_token__isnull=True).only("pk"):
+        listing.ical_token = listings.models.new_ical_token()
+        listing.save(update_fields=["ical_token"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0011_availabilityrule"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listing",
+            name="ical_token",
+            field=models.CharField(editable=False, max_length=32, null=True),
+        ),
+        migrations.RunPython(fill_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="listing",
+            name="ical_token",
+            field=models.CharField(default=listings.models.new_ical_token, editable=False, max_length=32, unique=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+def delete_empty_ranges(apps, schema_editor):
+    # Blocks and rules that end on the day they start close no nights.
+    apps.get_model("listings", "AvailabilityBlock").objects.filter(end_date__lte=models.F("start_date")).delete()
+    apps.get_model("listings", "AvailabilityRule").objects.filter(end_date__lte=models.F("start_date")).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0012_listing_ical_token"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_empty_ranges, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="availabilityblock",
+            constraint=models.CheckConstraint(
+                condition=models.Q(("end_date__gt", models.F("start_date"))),
+                name="availability_block_end_after_start",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="availabilityrule",
+            constraint=models.CheckConstraint(
+                condition=models.Q(("end_date__isnull", True), ("end_date__gt", models.F("start_date")), _connector="OR"),
+                name="availability_rule_end_after_start",
+            ),
+        ),
+    ]
@@ -1,6 +1,13 @@
+import secrets
+
 from django.conf import settings
 from django.contrib.gis.db import models
-from django.contrib.postgres.indexes import GistIndex
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.fields import ArrayField, DateRangeField
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import transaction
+from django.db.models import F, Func, OuterRef, Q
 from django.template.defaultfilters import slugify
 
 
@@ -14,6 +21,18 @@ class Amenity(models.Model):
         return self.name
 
 
+def new_ical_token():
+    return secrets.token_urlsafe(24)
+
+
+# Weighted so title matches outrank city matches, which outrank description matches.
+LISTING_SEARCH_VECTOR = (
+    SearchVector("title", weight="A", config="english")
+    + SearchVector("city", weight="B", config="english")
+    + SearchVector("description", weight="C", config="english")
+)
+
+
 class Listing(models.Model):
     class Status(models.TextChoices):
         DRAFT = "draft", "Draft"
@@ -54,13 +73,29 @@ class Listing(models.Model):
         default=CancellationPolicy.MODERATE,
     )
     amenities = models.ManyToManyField(Amenity, blank=True, related_name="listings")
+    # Denormalized copy of ``amenities`` so "has all of these" is one GIN-indexed @> test.
+    amenity_ids = ArrayField(models.BigIntegerField(), default=list, blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Last block or approved-stay change; the iCal feed's Last-Modified/ETag.
+    availability_updated_at = models.DateTimeField(null=True, editable=False)
+    # Secret part of the iCal feed URL: the feed lists approved stays, so only
+    # channels the host hands the URL to can read it.
+    ical_token = models.CharField(max_length=32, unique=True, editable=False, default=new_ical_token)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [
             models.Index(fields=["status", "city", "nightly_rate_usd"]),
+            # Keyset pagination for the price and newest search sorts (scanned in either direction).
+            models.Index(fields=["status", "nightly_rate_usd", "id"]),
+            models.Index(fields=["status", "created_at", "id"]),
             GistIndex(fields=["location"]),
+            GinIndex(fields=["search_vector"]),
+            GinIndex(fields=["amenity_ids"]),
+            # Location autocomplete (pg_trgm, extension created by core).
+            GinIndex(fields=["city"], name="listings_city_trgm", opclasses=["gin_trgm_ops"]),
+            GinIndex(fields=["region"], name="listings_region_trgm", opclasses=["gin_trgm_ops"]),
         ]
         ordering = ["-created_at"]
 
@@ -68,6 +103,14 @@ class Listing(models.Model):
         if not self.slug:
             self.slug = slugify(f"{self.title}-{self.host_id}")
         super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"title", "city", "description"} & set(update_fields):
+            Listing.objects.filter(pk=self.pk).update(search_vector=LISTING_SEARCH_VECTOR)
+
+    def sync_amenity_ids(self):
+        through = Listing.amenities.through
+        amenity_ids = through.objects.filter(listing_id=OuterRef("pk")).order_by("amenity_id").values("amenity_id")
+        Listing.objects.filter(pk=self.pk).update(amenity_ids=ArraySubquery(amenity_ids))
 
     def __str__(self) -> str:
         return self.title
@@ -94,11 +137,122 @@ class AvailabilityBlock(models.Model):
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="availability_blocks")
     start_date = models.DateField()
     end_date = models.DateField()
+    # [start_date, end_date) maintained by Postgres for GiST overlap lookups.
+    span = models.GeneratedField(
+        expression=Func(F("start_date"), F("end_date"), function="daterange", output_field=DateRangeField()),
+        output_field=DateRangeField(),
+        db_persist=True,
+    )
     reason = models.CharField(max_length=120, blank=True)
+    # UID of the iCal event this block was imported from; blank for blocks made here.
+    external_uid = models.CharField(max_length=255, blank=True)
 
     class Meta:
-        indexes = [models.Index(fields=["listing", "start_date", "end_date"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["listing", "external_uid"],
+                condition=~Q(external_uid=""),
+                name="unique_block_external_uid",
+            ),
+            # daterange() in ``span`` errors on a reversed range; this turns that into a validation error.
+            models.CheckConstraint(condition=Q(end_date__gt=F("start_date")), name="availability_block_end_after_start"),
+        ]
+        indexes = [
+            models.Index(fields=["listing", "start_date", "end_date"]),
+            GistIndex(fields=["listing", "span"]),
+        ]
         ordering = ["start_date"]
 
+    def save(self, *args, **kwargs):
+        from listings.occupancy import refresh_listing_occupancy
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            refresh_listing_occupancy(self.listing_id)
+
+    def delete(self, *args, **kwargs):
+        from listings.occupancy import refresh_listing_occupancy
+
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            refresh_listing_occupancy(self.listing_id, self.start_date, self.end_date)
+        return result
+
     def __str__(self) -> str:
         return f"{self.listing.title} {self.start_date} - {self.end_date}"
+
+
+class AvailabilityRule(models.Model):
+    """Nights closed every week on the weekdays in ``weekday_mask``, between two dates.
+
+    Expanded over the requested window as a bitmask (see ``listings.rules``)
+    instead of being stored as one block per closed night.
+    """
+
+    WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="availability_rules")
+    # Bit 0 is Monday ... bit 6 is Sunday, matching date.weekday().
+    weekday_mask = models.PositiveSmallIntegerField()
+    start_date = models.DateField()
+    # Exclusive; open-ended when blank.
+    end_date = models.DateField(null=True, blank=True)
+    span = models.GeneratedField(
+        expression=Func(F("start_date"), F("end_date"), function="daterange", output_field=DateRangeField()),
+        output_field=DateRangeField(),
+        db_persist=True,
+    )
+    # Nights the rule would close but that stay open.
+    exclusions = ArrayField(models.DateField(), default=list, blank=True)
+    reason = models.CharField(max_length=120, blank=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(weekday_mask__gt=0, weekday_mask__lt=128),
+                name="availability_rule_weekday_mask_range",
+            ),
+            models.CheckConstraint(
+                condition=Q(end_date__isnull=True) | Q(end_date__gt=F("start_date")),
+                name="availability_rule_end_after_start",
+            ),
+        ]
+        indexes = [GistIndex(fields=["listing", "span"])]
+        ordering = ["start_date"]
+
+    def save(self, *args, **kwargs):
+        from listings.occupancy import refresh_listing_occupancy
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            refresh_listing_occupancy(self.listing_id)
+
+    def delete(self, *args, **kwargs):
+        from listings.occupancy import refresh_listing_occupancy
+
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            refresh_listing_occupancy(self.listing_id, self.start_date, self.end_date)
+        return result
+
+    @property
+    def weekdays(self):
+        return [name for bit, name in enumerate(self.WEEKDAYS) if self.weekday_mask & (1 << bit)]
+
+    def __str__(self) -> str:
+        return f"{self.listing.title} {'/'.join(self.weekdays)} from {self.start_date}"
+
+
+class OccupiedNight(models.Model):
+    """One row per night a listing cannot be booked, derived from blocks, rules and approved reservations."""
+
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="occupied_nights")
+    night = models.DateField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["listing", "night"], name="unique_listing_occupied_night")]
+        indexes = [models.Index(fields=["night", "listing"])]
+        ordering = ["listing", "night"]
+
+    def __str__(self) -> str:
+        return f"{self.listing_id} {self.night}"
@@ -0,0 +1,135 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from listings.models import AvailabilityBlock, Listing, OccupiedNight
+from listings.rules import mask_nights, overlapping_rules, rule_mask
+from reservations.models import Reservation
+
+ONE_DAY = datetime.timedelta(days=1)
+
+# Nights are materialized a month past the searchable horizon so a missed
+# daily rebuild does not leave the tail of the horizon empty.
+MATERIALIZE_SLACK_DAYS = 31
+
+
+def searchable_window():
+    today = timezone.localdate()
+    return today, today + datetime.timedelta(days=getattr(settings, "COVACH_OCCUPANCY_HORIZON_DAYS", 365))
+
+
+def materialized_window():
+    start, end = searchable_window()
+    return start, end + datetime.timedelta(days=MATERIALIZE_SLACK_DAYS)
+
+
+def covers(check_in, check_out) -> bool:
+    start, end = searchable_window()
+    return start <= check_in and check_out <= end
+
+
+def occupied_listing_ids(check_in, check_out):
+    return OccupiedNight.objects.filter(night__gte=check_in, night__lt=check_out).values("listing_id")
+
+
+def expected_nights(listing_ids, start, end):
+    """Derive occupied ``(listing_id, night)`` pairs from blocks, rules and approved stays."""
+    spans = list(
+        AvailabilityBlock.objects.filter(
+            listing_id__in=listing_ids,
+            start_date__lt=end,
+            end_date__gt=start,
+        ).values_list("listing_id", "start_date", "end_date")
+    )
+    spans += Reservation.objects.filter(
+        listing_id__in=listing_ids,
+        status=Reservation.Status.APPROVED,
+        check_in__lt=end,
+        check_out__gt=start,
+    ).values_list("listing_id", "check_in", "check_out")
+
+    nights = set()
+    for listing_id, span_start, span_end in spans:
+        night = max(span_start, start)
+        while night < min(span_end, end):
+            nights.add((listing_id, night))
+            night += ONE_DAY
+
+    masks = {}
+    for rule in overlapping_rules(listing_ids, start, end):
+        masks[rule.listing_id] = masks.get(rule.listing_id, 0) | rule_mask(rule, start, end)
+    for listing_id, mask in masks.items():
+        nights.update((listing_id, night) for night in mask_nights(mask, start))
+    return nights
+
+
+def refresh_listing_occupancy(listing_id, start=None, end=None):
+    """Re-derive the occupied nights of one listing between ``start`` and ``end``.
+
+    Call this inside the transaction that changes a block or an approved
+    reservation so search never sees the two out of step.
+    """
+    window_start, window_end = materialized_window()
+    start = max(start or window_start, window_start)
+    end = min(end or window_end, window_end)
+    if start >= end:
+        return
+
+    with transaction.atomic():
+        OccupiedNight.objects.filter(listing_id=listing_id, night__gte=start, night__lt=end).delete()
+        OccupiedNight.objects.bulk_create(
+            [OccupiedNight(listing_id=listing_id, night=night) for _, night in expected_nights([listing_id], start, end)],
+            ignore_conflicts=True,
+        )
+
+
+def _stored_nights(listing_ids, start, end):
+    return set(
+        OccupiedNight.objects.filter(
+            listing_id__in=listing_ids,
+            night__gte=start,
+            night__lt=end,
+        ).values_list("listing_id", "night")
+    )
+
+
+def _listing_id_chunks(chunk_size):
+    listing_ids = list(Listing.objects.order_by("pk").values_list("pk", flat=True))
+    for index in range(0, len(listing_ids), chunk_size):
+        yield listing_ids[index : index + chunk_size]
+
+
+def rebuild_occupancy(chunk_size=200):
+    """Rewrite the whole materialized window and drop nights that have passed."""
+    start, end = materialized_window()
+    OccupiedNight.objects.filter(night__lt=start).delete()
+    total = 0
+    for listing_ids in _listing_id_chunks(chunk_size):
+        nights = expected_nights(listing_ids, start, end)
+        with transaction.atomic():
+            OccupiedNight.objects.filter(listing_id__in=listing_ids, night__gte=start).delete()
+            OccupiedNight.objects.bulk_create(
+                [OccupiedNight(listing_id=listing_id, night=night) for listing_id, night in nights],
+                ignore_conflicts=True,
+            )
+        total += len(nights)
+    return total
+
+
+def verify_occupancy(chunk_size=200):
+    """Return ``{listing_id: (missing, unexpected)}`` for listings that drifted."""
+    start, end = materialized_window()
+    drift = {}
+    for listing_ids in _listing_id_chunks(chunk_size):
+        expected = expected_nights(listing_ids, start, end)
+        stored = _stored_nights(listing_ids, start, end)
+        for listing_id, night in expected - stored:
+            drift.setdefault(listing_id, ([], []))[0].append(night)
+        for listing_id, night in stored - expected:
+            drift.setdefault(listing_id, ([], []))[1].append(night)
+    for missing, unexpected in drift.values():
+        missing.sort()
+        unexpected.sort()
+    return drift
@@ -0,0 +1,101 @@
+"""Recurring closures (``AvailabilityRule``) expanded lazily over a requested window.
+
+In Python a window is an int bitmask, bit ``i`` standing for night
+``start + i``: a rule's weekly pattern is rotated to the window's first
+weekday and repeated with one multiplication, so checking a year costs the
+same handful of integer operations as checking a weekend. Set-based queries
+use ``rule_nights_sql`` to expand rules inside Postgres instead.
+"""
+
+import datetime
+
+from django.db.backends.postgresql.psycopg_any import DateRange
+
+from listings.models import AvailabilityRule
+
+WEEK = 0b1111111
+
+
+def weekly_mask(weekday_mask, start, nights):
+    """Bitmask of the ``nights`` nights from ``start`` that fall on a weekday in ``weekday_mask``."""
+    if nights <= 0:
+        return 0
+    shift = start.weekday()
+    rotated = ((weekday_mask >> shift) | (weekday_mask << (7 - shift))) & WEEK
+    weeks = -(-nights // 7)
+    # rotated * 0b...0000001_0000001: the 7-bit pattern once per week.
+    repeated = rotated * (((1 << (7 * weeks)) - 1) // WEEK)
+    return repeated & ((1 << nights) - 1)
+
+
+def rule_mask(rule, start, end):
+    """Nights of ``[start, end)`` that ``rule`` closes."""
+    low = max(start, rule.start_date)
+    high = min(end, rule.end_date or end)
+    if low >= high:
+        return 0
+    mask = weekly_mask(rule.weekday_mask, low, (high - low).days) << (low - start).days
+    for night in rule.exclusions:
+        if low <= night < high:
+            mask &= ~(1 << (night - start).days)
+    return mask
+
+
+def closed_mask(rules, start, end):
+    mask = 0
+    for rule in rules:
+        mask |= rule_mask(rule, start, end)
+    return mask
+
+
+def mask_nights(mask, start):
+    """The nights whose bits are set in ``mask``."""
+    while mask:
+        low_bit = mask & -mask
+        yield start + datetime.timedelta(days=low_bit.bit_length() - 1)
+        mask ^= low_bit
+
+
+def mask_runs(mask, start):
+    """``(first night, end)`` of each run of consecutive set bits in ``mask``."""
+    offset = 0
+    while mask:
+        gap = (mask & -mask).bit_length() - 1
+        mask >>= gap
+        # mask ^ (mask + 1) is all ones up to and including the lowest clear bit.
+        length = (mask ^ (mask + 1)).bit_length() - 1
+        yield start + datetime.timedelta(days=offset + gap), start + datetime.timedelta(days=offset + gap + length)
+        mask >>= length
+        offset += gap + length
+
+
+def overlapping_rules(listing_ids, start, end):
+    return AvailabilityRule.objects.filter(listing_id__in=listing_ids, span__overlap=DateRange(start, end))
+
+
+def closes_any_night(listing_id, start, end) -> bool:
+    return closed_mask(overlapping_rules([listing_id], start, end), start, end) != 0
+
+
+def rule_nights_sql(listing_column, start, end):
+    """``(sql, params)`` selecting ``daterange(night, night + 1) AS span`` per closed night in ``[start, end)``.
+
+    ``listing_column`` is the outer query's listing id column to correlate on,
+    or ``%s`` with the listing id put in front of the returned params.
+    """
+    rules = AvailabilityRule._meta.db_table
+    sql = f"""
+        SELECT daterange(night::date, night::date + 1) AS span
+        FROM (
+            SELECT * FROM {rules}
+            WHERE listing_id = {listing_column} AND span && daterange(%s, %s)
+        ) recurring
+        CROSS JOIN LATERAL generate_series(
+            GREATEST(lower(recurring.span), %s::date),
+            LEAST(COALESCE(upper(recurring.span), %s::date), %s::date) - 1,
+            interval '1 day'
+        ) AS night
+        WHERE recurring.weekday_mask & (1 << (extract(isodow FROM night)::int - 1)) <> 0
+            AND NOT night::date = ANY(recurring.exclusions)
+    """
+    return sql, [start, end, start, end, end]
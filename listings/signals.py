@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from listings.calendar import availability_changed
+from listings.models import AvailabilityBlock, AvailabilityRule
+from reservations.models import Reservation
+from reservations.state_machine import status_changed
+
+
+@receiver(post_save, sender=AvailabilityBlock)
+@receiver(post_delete, sender=AvailabilityBlock)
+@receiver(post_save, sender=AvailabilityRule)
+@receiver(post_delete, sender=AvailabilityRule)
+def _block_changed(sender, instance, **kwargs):
+    availability_changed(instance.listing_id)
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def _reservation_changed(sender, instance, **kwargs):
+    if instance.status in Reservation.OCCUPANCY_STATUSES:
+        availability_changed(instance.listing_id)
+
+
+@receiver(status_changed, sender=Reservation)
+def _reservation_transitioned(sender, reservation_ids, source, target, **kwargs):
+    if Reservation.Status.APPROVED in (source, target):
+        listing_ids = Reservation.objects.filter(pk__in=reservation_ids).values_list("listing_id", flat=True).distinct()
+        for listing_id in listing_ids:
+            availability_changed(listing_id)
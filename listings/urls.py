@@ -2,11 +2,13 @@ from django.urls import path
 
 from listings.views import (
     host_listings,
+    listing_availability_calendar,
     listing_availability_partial,
     listing_create,
     listing_delete,
     listing_detail,
     listing_edit,
+    listing_ical,
 )
 
 app_name = "listings"
@@ -20,4 +22,6 @@ urlpatterns = [
     path("host/listings/<int:pk>/archive/", listing_delete, name="archive"),
     path("hx/listings/<int:pk>/availability", listing_availability_partial),
     path("hx/listings/<int:pk>/availability/", listing_availability_partial, name="availability"),
+    path("listings/<int:pk>/calendar/", listing_availability_calendar, name="calendar"),
+    path("listings/ical/<slug:token>.ics", listing_ical, name="ical"),
 ]
@@ -1,12 +1,19 @@
+import datetime
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+from django.views.decorators.http import condition
 
 from core.permissions import approved_host_required
-from listings.forms import AvailabilityBlockForm, ListingForm, ListingPhotoForm
-from listings.models import AvailabilityBlock, Listing, ListingPhoto
-from reservations.models import Reservation
+from listings.calendar import BOOKED, month_calendar, month_start, month_window, parse_month
+from listings.blocks import block_dates
+from listings.forms import AvailabilityBlocksForm, AvailabilityRuleForm, ListingForm, ListingPhotoForm
+from listings.ical import export_calendar
+from listings.models import AvailabilityRule, Listing, ListingPhoto
 
 
 def listing_detail(request, slug):
@@ -44,17 +51,29 @@ def listing_edit(request, pk):
         initial = {"latitude": listing.location.y, "longitude": listing.location.x}
 
     form = ListingForm(instance=listing, initial=initial)
-    block_form = AvailabilityBlockForm()
+    block_form = AvailabilityBlocksForm()
+    rule_form = AvailabilityRuleForm(prefix="rule")
     photo_form = ListingPhotoForm()
 
     if request.method == "POST" and request.POST.get("block_form") == "1":
-        block_form = AvailabilityBlockForm(request.POST)
+        block_form = AvailabilityBlocksForm(request.POST)
         if block_form.is_valid():
-            block = block_form.save(commit=False)
-            block.listing = listing
-            block.save()
-            messages.success(request, "Availability block added.")
+            block_dates(listing, block_form.cleaned_data["spans"], block_form.cleaned_data["reason"])
+            messages.success(request, "Availability blocks updated.")
+            return redirect("listings:edit", pk=listing.pk)
+    elif request.method == "POST" and request.POST.get("rule_form") == "1":
+        rule_form = AvailabilityRuleForm(request.POST, prefix="rule")
+        if rule_form.is_valid():
+            rule = rule_form.save(commit=False)
+            rule.listing = listing
+            rule.save()
+            messages.success(request, "Recurring closure added.")
             return redirect("listings:edit", pk=listing.pk)
+    elif request.method == "POST" and request.POST.get("delete_rule", "").isdigit():
+        rule = get_object_or_404(AvailabilityRule, pk=request.POST["delete_rule"], listing=listing)
+        rule.delete()
+        messages.success(request, "Recurring closure removed.")
+        return redirect("listings:edit", pk=listing.pk)
     elif request.method == "POST" and request.POST.get("photo_form") == "1":
         photo_form = ListingPhotoForm(request.POST, request.FILES)
         if photo_form.is_valid():
@@ -81,30 +100,77 @@ def listing_edit(request, pk):
             "listing": listing,
             "mode": "edit",
             "block_form": block_form,
+            "rule_form": rule_form,
+            "rules": listing.availability_rules.all(),
             "photo_form": photo_form,
             "blocks": blocks,
             "photos": photos,
+            **_month_grid(request, listing),
         },
     )
 
 
+def _calendar_month(request, listing):
+    month = parse_month(request.GET.get("month"))
+    return month, month_calendar(listing.pk, month)
+
+
+def _month_grid(request, listing):
+    month, calendar = _calendar_month(request, listing)
+    start, end = month_window(month)
+    return {
+        "month": start,
+        "previous_month": month_start(start - datetime.timedelta(days=1)),
+        "next_month": end,
+        "leading_days": range(start.weekday()),
+        "days": [(start + datetime.timedelta(days=offset), flag == BOOKED) for offset, flag in enumerate(calendar["days"])],
+        "unavailable": calendar["unavailable"],
+    }
+
+
 @login_required
 def listing_availability_partial(request, pk):
     listing = get_object_or_404(Listing, pk=pk)
-    approved_reservations = Reservation.objects.filter(
-        listing=listing,
-        status=Reservation.Status.APPROVED,
-    ).values("check_in", "check_out")
-    blocks = AvailabilityBlock.objects.filter(listing=listing).values("start_date", "end_date", "reason")
-    return render(
-        request,
-        "partials/availability_table.html",
-        {
-            "listing": listing,
-            "approved_reservations": approved_reservations,
-            "blocks": blocks,
-        },
-    )
+    return render(request, "partials/availability_table.html", {"listing": listing, **_month_grid(request, listing)})
+
+
+@login_required
+def listing_availability_calendar(request, pk):
+    listing = get_object_or_404(Listing, pk=pk)
+    _, calendar = _calendar_month(request, listing)
+    return JsonResponse(calendar)
+
+
+def _feed_listings(token):
+    return Listing.objects.filter(ical_token=token, status=Listing.Status.PUBLISHED)
+
+
+def _availability_changed_at(token):
+    stamps = _feed_listings(token).values_list("availability_updated_at", "created_at").first()
+    return stamps and (stamps[0] or stamps[1])
+
+
+# The feed starts today and expands rules up to a horizon that slides with it,
+# so its body also changes at midnight without any write to the listing.
+def _availability_modified(request, token):
+    changed = _availability_changed_at(token)
+    midnight = timezone.make_aware(datetime.datetime.combine(timezone.localdate(), datetime.time()))
+    return changed and max(changed, midnight)
+
+
+def _availability_etag(request, token):
+    changed = _availability_changed_at(token)
+    return changed and f'"{changed.timestamp():.6f}-{timezone.localdate():%Y%m%d}"'
+
+
+# Channel managers poll this every few minutes; unchanged polls end in a 304
+# after one indexed listing lookup, without reading blocks or reservations.
+@condition(etag_func=_availability_etag, last_modified_func=_availability_modified)
+def listing_ical(request, token):
+    listing = get_object_or_404(_feed_listings(token))
+    response = HttpResponse(export_calendar(listing), content_type="text/calendar; charset=utf-8")
+    response["Content-Disposition"] = f'inline; filename="listing-{listing.pk}.ics"'
+    return response
 
 
 @approved_host_required
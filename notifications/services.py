@@ -1,6 +1,8 @@
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import send_mail, send_mass_mail
+from django.db import transaction
 
+from core.instrumentation import timed
 from notifications.models import UserNotification
 
 
@@ -13,10 +15,42 @@ def notify_user(user, notification_type, title, body, payload=None):
         body=body,
         payload_json=payload,
     )
-    send_mail(
-        subject=title,
-        message=body,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[user.email],
-        fail_silently=True,
+    with timed("email"):
+        send_mail(
+            subject=title,
+            message=body,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[user.email],
+            fail_silently=True,
+        )
+
+
+def notify_users(notifications):
+    """Bulk ``notify_user`` for ``(user, notification_type, title, body, payload)`` tuples.
+
+    The rows go in with one INSERT; the emails are sent after commit over a
+    single SMTP connection.
+    """
+    notifications = list(notifications)
+    UserNotification.objects.bulk_create(
+        UserNotification(
+            user=user,
+            notification_type=notification_type,
+            title=title,
+            body=body,
+            payload_json=payload or {},
+        )
+        for user, notification_type, title, body, payload in notifications
     )
+    messages = [
+        (title, body, settings.DEFAULT_FROM_EMAIL, [user.email])
+        for user, _, title, body, _ in notifications
+        if user.email
+    ]
+
+    def send():
+        with timed("email"):
+            send_mass_mail(messages, fail_silently=True)
+
+    if messages:
+        transaction.on_commit(send)
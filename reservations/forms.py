@@ -20,3 +20,26 @@ class ReservationRequestForm(forms.Form):
         required=False,
         widget=forms.Textarea(attrs={"class": _textarea, "rows": 3, "placeholder": "Introduce yourself to the host..."}),
     )
+
+
+class _IdListField(forms.Field):
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        try:
+            return sorted({int(item) for item in value or []})
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Invalid reservation selection.") from None
+
+
+class BatchDecisionForm(forms.Form):
+    MAX_RESERVATIONS = 200
+
+    action = forms.ChoiceField(choices=[("approve", "Approve"), ("decline", "Decline")])
+    reservation_ids = _IdListField()
+
+    def clean_reservation_ids(self):
+        reservation_ids = self.cleaned_data["reservation_ids"]
+        if len(reservation_ids) > self.MAX_RESERVATIONS:
+            raise forms.ValidationError(f"Select at most {self.MAX_RESERVATIONS} reservations at a time.")
+        return reservation_ids
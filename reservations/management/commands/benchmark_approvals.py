@@ -0,0 +1,114 @@
+import datetime
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from accounts.models import HostProfile
+from listings.models import Listing
+from reservations.models import Reservation
+from reservations.services import ReservationError, approve_request
+
+
+class Command(BaseCommand):
+    help = "Hammer approve_request with overlapping requests from many threads and report contention"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--requests", type=int, default=200, help="Overlapping requests to approve")
+        parser.add_argument("--keep", action="store_true", help="Keep the scratch listing and users")
+
+    def handle(self, *args, **options):
+        if options["threads"] < 1 or options["requests"] < 1:
+            raise CommandError("--threads and --requests must be positive")
+
+        listing, users = self._scratch_data(options["requests"])
+        reservation_ids = list(listing.reservations.values_list("pk", flat=True))
+        outcomes = {"approved": 0, "rejected": 0}
+        latencies = []
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(options["threads"])
+
+        def approve(reservation_id):
+            began = time.perf_counter()
+            try:
+                approve_request(reservation_id=reservation_id, actor=listing.host)
+                outcome = "approved"
+            except ReservationError:
+                outcome = "rejected"
+            with lock:
+                outcomes[outcome] += 1
+                latencies.append(time.perf_counter() - began)
+
+        def worker(chunk):
+            start_barrier.wait()
+            try:
+                for reservation_id in chunk:
+                    approve(reservation_id)
+            finally:
+                connection.close()
+
+        chunks = [reservation_ids[index :: options["threads"]] for index in range(options["threads"])]
+        # Notifications would otherwise go to the real email backend once per approval.
+        with override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"):
+            began = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+                list(pool.map(worker, chunks))
+            elapsed = time.perf_counter() - began
+
+        approved = Reservation.objects.filter(listing=listing, status=Reservation.Status.APPROVED).count()
+        latencies.sort()
+        self.stdout.write(
+            f"{len(latencies)} approvals in {elapsed:.2f}s ({len(latencies) / elapsed:.0f}/s) "
+            f"on {options['threads']} threads: {outcomes['approved']} approved, {outcomes['rejected']} rejected"
+        )
+        self.stdout.write(
+            f"latency p50 {statistics.median(latencies) * 1000:.1f}ms, "
+            f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms"
+        )
+
+        if not options["keep"]:
+            listing.delete()
+            get_user_model().objects.filter(pk__in=[user.pk for user in users]).delete()
+        if approved != 1:
+            raise CommandError(f"Expected exactly one approved stay, found {approved}")
+        self.stdout.write(self.style.SUCCESS("Exactly one overlapping stay was approved"))
+
+    def _scratch_data(self, count):
+        User = get_user_model()
+        tag = uuid.uuid4().hex[:8]
+        host = User.objects.create_user(username=f"bench-host-{tag}@example.com", email=f"bench-host-{tag}@example.com")
+        HostProfile.objects.create(user=host, status=HostProfile.Status.APPROVED)
+        guest = User.objects.create_user(username=f"bench-guest-{tag}@example.com", email=f"bench-guest-{tag}@example.com")
+        listing = Listing.objects.create(
+            host=host,
+            title=f"Approval benchmark {tag}",
+            description="Scratch listing for benchmark_approvals",
+            property_type=Listing.PropertyType.APARTMENT,
+            street_address="1 Benchmark Way",
+            city="Benchmark",
+            nightly_rate_usd=100,
+            status=Listing.Status.DRAFT,
+        )
+        check_in = timezone.localdate() + datetime.timedelta(days=30)
+        Reservation.objects.bulk_create(
+            Reservation(
+                listing=listing,
+                guest=guest,
+                host=host,
+                # Every request overlaps every other one on at least the middle night.
+                check_in=check_in + datetime.timedelta(days=index % 3),
+                check_out=check_in + datetime.timedelta(days=3 + index % 3),
+                guests=1,
+                expires_at=timezone.now() + datetime.timedelta(hours=1),
+            )
+            for index in range(count)
+        )
+        return listing, [host, guest]
@@ -1,4 +1,6 @@
-from django.core.management.base import BaseCommand
+import time
+
+from django.core.management.base import BaseCommand, CommandError
 
 from reservations.services import expire_open_requests
 
@@ -6,6 +8,18 @@ from reservations.services import expire_open_requests
 class Command(BaseCommand):
     help = "Expire stale reservation requests"
 
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Requests expired per transaction")
+        parser.add_argument("--max-seconds", type=float, default=None, help="Stop starting new batches after this long")
+
     def handle(self, *args, **options):
-        count = expire_open_requests()
-        self.stdout.write(self.style.SUCCESS(f"Expired {count} reservation requests"))
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        started = time.perf_counter()
+        count = expire_open_requests(batch_size=options["batch_size"], max_seconds=options["max_seconds"])
+        elapsed = time.perf_counter() - started
+        rate = count / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(f"Expired {count} reservation requests in {elapsed:.2f}s ({rate:.0f}/s)")
+        )
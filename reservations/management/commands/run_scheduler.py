@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reservations.scheduler import ExpiryScheduler
+
+
+class Command(BaseCommand):
+    help = "Expire reservation requests as their deadlines pass (long-running)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Requests expired per transaction")
+        parser.add_argument(
+            "--refill-seconds",
+            type=int,
+            default=300,
+            help="How often to reload upcoming deadlines from the database",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1 or options["refill_seconds"] < 1:
+            raise CommandError("--batch-size and --refill-seconds must be positive")
+
+        scheduler = ExpiryScheduler(batch_size=options["batch_size"], refill_seconds=options["refill_seconds"])
+        self.stdout.write("Scheduler running; waiting for reservation deadlines")
+        scheduler.run(on_expired=lambda count: self.stdout.write(f"Expired {count} reservation requests"))
+        self.stdout.write(self.style.SUCCESS("Scheduler stopped"))
@@ -0,0 +1,37 @@
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_btree_gist"),
+        ("reservations", "0002_rename_reservations_listing_458139_idx_reservation_listing_fdd061_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservation",
+            name="stay",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.expressions.Func(
+                    models.F("check_in"),
+                    models.F("check_out"),
+                    function="daterange",
+                    output_field=django.contrib.postgres.fields.ranges.DateRangeField(),
+                ),
+                output_field=django.contrib.postgres.fields.ranges.DateRangeField(),
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="reservation",
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                condition=models.Q(("status", "approved")),
+                expressions=[("listing", "="), ("stay", "&&")],
+                name="exclude_overlapping_approved_stays",
+            ),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0004_reservation_status_expires_at_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservation",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -1,11 +1,16 @@
 from decimal import Decimal
 
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, RangeOperators
+from django.db import models, transaction
+from django.db.models import F, Func, Q
 from django.utils import timezone
 
 from listings.models import Listing
 
+STAY_EXCLUSION_CONSTRAINT = "exclude_overlapping_approved_stays"
+
 
 class Reservation(models.Model):
     class Status(models.TextChoices):
@@ -26,17 +31,60 @@ class Reservation(models.Model):
     guest_message = models.TextField(blank=True)
     cancellation_fee_usd = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
     expires_at = models.DateTimeField()
+    # Bumped on every status transition; see reservations.state_machine.
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # [check_in, check_out) maintained by Postgres; backs the overlap exclusion constraint.
+    stay = models.GeneratedField(
+        expression=Func(F("check_in"), F("check_out"), function="daterange", output_field=DateRangeField()),
+        output_field=DateRangeField(),
+        db_persist=True,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
+        constraints = [
+            # Two approved stays on one listing can never overlap, however many
+            # hosts' sessions approve at once (needs btree_gist for listing =).
+            ExclusionConstraint(
+                name=STAY_EXCLUSION_CONSTRAINT,
+                expressions=[("listing", RangeOperators.EQUAL), ("stay", RangeOperators.OVERLAPS)],
+                condition=Q(status="approved"),
+            ),
+        ]
         indexes = [
             models.Index(fields=["listing", "status", "check_in", "check_out"]),
             models.Index(fields=["host", "status", "created_at"]),
             models.Index(fields=["guest", "status", "created_at"]),
+            models.Index(fields=["status", "expires_at"]),
         ]
         ordering = ["-created_at"]
 
+    # Only approved stays occupy nights; canceled ones may have been approved before.
+    OCCUPANCY_STATUSES = {Status.APPROVED, Status.CANCELED}
+
+    def save(self, *args, **kwargs):
+        from listings.occupancy import refresh_listing_occupancy
+
+        update_fields = kwargs.get("update_fields")
+        touches_occupancy = self.status in self.OCCUPANCY_STATUSES and (
+            update_fields is None or {"status", "check_in", "check_out"} & set(update_fields)
+        )
+        if not touches_occupancy:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            refresh_listing_occupancy(self.listing_id, self.check_in, self.check_out)
+
+    def delete(self, *args, **kwargs):
+        from listings.occupancy import refresh_listing_occupancy
+
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if self.status == self.Status.APPROVED:
+                refresh_listing_occupancy(self.listing_id, self.check_in, self.check_out)
+        return result
+
     def __str__(self) -> str:
         return f"{self.listing.title} ({self.guest.email})"
 
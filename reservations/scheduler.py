@@ -0,0 +1,117 @@
+"""Long-running expiry of reservation requests, driven by their deadlines.
+
+The scheduler keeps a min-heap of upcoming ``expires_at`` values and sleeps in
+``select()`` on its database connection until the earliest one. New requests
+announce their deadline with ``pg_notify`` so it wakes early for them; a
+periodic refill catches anything announced while it was down. Needs psycopg2
+(``connection.connection.poll()`` / ``.notifies``).
+"""
+
+import datetime
+import heapq
+import logging
+import select
+import signal
+import time
+
+from django.db import InterfaceError, OperationalError, connection
+from django.utils import timezone
+
+from reservations.models import Reservation
+from reservations.services import DEADLINE_CHANNEL, expire_open_requests
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryScheduler:
+    def __init__(self, batch_size=500, horizon_seconds=3600, refill_seconds=300):
+        self.batch_size = batch_size
+        # Only deadlines this close are kept in memory; later ones arrive with a refill.
+        self.horizon_seconds = horizon_seconds
+        self.refill_seconds = refill_seconds
+        self.deadlines = []
+        self.next_refill = 0.0
+        self.stopping = False
+
+    def push(self, reservation_id, deadline):
+        if deadline <= time.time() + self.horizon_seconds:
+            heapq.heappush(self.deadlines, (deadline, reservation_id))
+
+    def refill(self):
+        horizon = timezone.now() + datetime.timedelta(seconds=self.horizon_seconds)
+        pending = Reservation.objects.filter(
+            status=Reservation.Status.REQUESTED,
+            expires_at__lte=horizon,
+        ).values_list("pk", "expires_at")
+        self.deadlines = [(expires_at.timestamp(), pk) for pk, expires_at in pending.iterator()]
+        heapq.heapify(self.deadlines)
+        self.next_refill = time.monotonic() + self.refill_seconds
+
+    def seconds_until_next(self):
+        until_refill = max(self.next_refill - time.monotonic(), 0)
+        if not self.deadlines:
+            return until_refill
+        return min(max(self.deadlines[0][0] - time.time(), 0), until_refill)
+
+    def expire_due(self):
+        now = time.time()
+        if not self.deadlines or self.deadlines[0][0] > now:
+            return 0
+        while self.deadlines and self.deadlines[0][0] <= now:
+            heapq.heappop(self.deadlines)
+        # Set-based: one call expires everything due, including rows approved
+        # or declined since they were queued (they simply no longer match).
+        return expire_open_requests(batch_size=self.batch_size)
+
+    def handle_notifications(self):
+        raw = connection.connection
+        # poll() talks to psycopg2 directly; translate its errors like the ORM does.
+        with connection.wrap_database_errors:
+            raw.poll()
+        while raw.notifies:
+            payload = raw.notifies.pop(0).payload
+            try:
+                reservation_id, deadline = payload.split(":")
+                self.push(int(reservation_id), float(deadline))
+            except ValueError:
+                logger.warning("Ignoring malformed deadline notification %r", payload)
+
+    def listen(self):
+        connection.close()
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {DEADLINE_CHANNEL}")
+        self.refill()
+
+    def reconnect(self):
+        while not self.stopping:
+            time.sleep(1)
+            try:
+                self.listen()
+                return
+            except (InterfaceError, OperationalError):
+                logger.warning("Database still unavailable; retrying")
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def run(self, on_expired=None):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.listen()
+        while not self.stopping:
+            try:
+                # Short cap so a stop signal is noticed promptly.
+                with connection.wrap_database_errors:
+                    readable, _, _ = select.select([connection.connection], [], [], min(self.seconds_until_next(), 5))
+                if readable:
+                    self.handle_notifications()
+                expired = self.expire_due()
+                if expired and on_expired:
+                    on_expired(expired)
+                if time.monotonic() >= self.next_refill:
+                    self.refill()
+            except (InterfaceError, OperationalError):
+                logger.exception("Scheduler lost its database connection; reconnecting")
+                self.reconnect()
+        connection.close()
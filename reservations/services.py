@@ -1,18 +1,22 @@
+import time
 from decimal import Decimal
 
 from django.conf import settings
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.backends.postgresql.psycopg_any import DateRange
 from django.utils import timezone
 
 from accounts.models import HostProfile
 from listings.models import AvailabilityBlock, Listing
+from listings.rules import closes_any_night
 from notifications.models import UserNotification
-from notifications.services import notify_user
+from notifications.services import notify_user, notify_users
 from reservations.models import Reservation, ReservationEvent
+from reservations.state_machine import ReservationError, bulk_transition, transition
 
 
-class ReservationError(Exception):
-    pass
+# Postgres NOTIFY channel the expiry scheduler (reservations.scheduler) listens on.
+DEADLINE_CHANNEL = "reservation_deadlines"
 
 
 def calculate_total_usd(listing: Listing, check_in, check_out) -> Decimal:
@@ -24,17 +28,24 @@ def _overlaps(listing, check_in, check_out):
     return Reservation.objects.filter(
         listing=listing,
         status=Reservation.Status.APPROVED,
-        check_in__lt=check_out,
-        check_out__gt=check_in,
+        stay__overlap=DateRange(check_in, check_out),
     ).exists()
 
 
 def _blocked(listing, check_in, check_out):
     return AvailabilityBlock.objects.filter(
         listing=listing,
-        start_date__lt=check_out,
-        end_date__gt=check_in,
-    ).exists()
+        span__overlap=DateRange(check_in, check_out),
+    ).exists() or closes_any_night(listing.pk, check_in, check_out)
+
+
+def announce_deadline(reservation):
+    """Wake a running expiry scheduler for a new deadline; delivered on commit."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_notify(%s, %s)",
+            [DEADLINE_CHANNEL, f"{reservation.pk}:{reservation.expires_at.timestamp()}"],
+        )
 
 
 def create_request(*, guest, listing: Listing, check_in, check_out, guests, message=""):
@@ -72,6 +83,7 @@ def create_request(*, guest, listing: Listing, check_in, check_out, guests, mess
         event_type="request_created",
         message="Reservation request submitted",
     )
+    announce_deadline(reservation)
     notify_user(
         listing.host,
         UserNotification.NotificationType.RESERVATION_REQUEST,
@@ -95,28 +107,74 @@ def _calculate_cancellation_fee(reservation: Reservation, canceled_at):
     return (reservation.total_usd * pct).quantize(Decimal("0.01"))
 
 
+def _decline_competing_requests(approved, actor):
+    """Decline every pending request overlapping ``approved``; they can no longer be approved.
+
+    Call inside the approving transaction. One SELECT, one conditional UPDATE
+    and bulk event/notification inserts regardless of how many requests competed.
+    """
+    candidates = list(
+        Reservation.objects.select_related("listing", "guest")
+        .filter(
+            listing_id=approved.listing_id,
+            status=Reservation.Status.REQUESTED,
+            stay__overlap=DateRange(approved.check_in, approved.check_out),
+        )
+        .exclude(pk=approved.pk)
+        .order_by("pk")
+    )
+    declined_ids = set(bulk_transition([reservation.pk for reservation in candidates], Reservation.Status.DECLINED))
+    competing = [reservation for reservation in candidates if reservation.pk in declined_ids]
+    if not competing:
+        return []
+
+    ReservationEvent.objects.bulk_create(
+        ReservationEvent(
+            reservation=reservation,
+            actor=actor,
+            event_type="request_declined",
+            message="Declined automatically: overlapping dates were approved",
+            metadata={"approved_reservation_id": approved.pk},
+        )
+        for reservation in competing
+    )
+    notify_users(
+        (
+            reservation.guest,
+            UserNotification.NotificationType.RESERVATION_DECLINED,
+            "Reservation declined",
+            f"Your reservation request for {reservation.listing.title} was declined: those dates are no longer available.",
+            {"reservation_id": reservation.id},
+        )
+        for reservation in competing
+    )
+    for reservation in competing:
+        reservation.status = Reservation.Status.DECLINED
+    return competing
+
+
 def approve_request(*, reservation_id, actor):
+    reservation = Reservation.objects.select_related("listing", "guest", "host").get(pk=reservation_id)
+    if reservation.host_id != actor.id:
+        raise ReservationError("Only the host can approve this request.")
+    if reservation.status != Reservation.Status.REQUESTED:
+        raise ReservationError("Only requested reservations can be approved.")
+    if reservation.expires_at <= timezone.now():
+        bulk_transition([reservation.pk], Reservation.Status.EXPIRED)
+        raise ReservationError("Reservation request has expired.")
+
     with transaction.atomic():
-        reservation = Reservation.objects.select_for_update().select_related("listing", "guest", "host").get(pk=reservation_id)
-        if reservation.host_id != actor.id:
-            raise ReservationError("Only the host can approve this request.")
-        if reservation.status != Reservation.Status.REQUESTED:
-            raise ReservationError("Only requested reservations can be approved.")
-        if reservation.expires_at <= timezone.now():
-            reservation.status = Reservation.Status.EXPIRED
-            reservation.save(update_fields=["status", "updated_at"])
-            raise ReservationError("Reservation request has expired.")
-        if _overlaps(reservation.listing, reservation.check_in, reservation.check_out):
-            raise ReservationError("Another approved reservation overlaps these dates.")
-
-        reservation.status = Reservation.Status.APPROVED
-        reservation.save(update_fields=["status", "updated_at"])
+        # Fails cleanly if a concurrent approval got here first (declining this
+        # request), via the exclusion constraint on an overlap, or when two
+        # overlapping approvals deadlock and Postgres aborts this one.
+        transition(reservation, Reservation.Status.APPROVED)
         ReservationEvent.objects.create(
             reservation=reservation,
             actor=actor,
             event_type="request_approved",
             message="Host approved reservation",
         )
+        reservation.declined_competitors = _decline_competing_requests(reservation, actor)
 
     notify_user(
         reservation.guest,
@@ -129,14 +187,14 @@ def approve_request(*, reservation_id, actor):
 
 
 def decline_request(*, reservation_id, actor):
+    reservation = Reservation.objects.select_related("listing", "guest", "host").get(pk=reservation_id)
+    if reservation.host_id != actor.id:
+        raise ReservationError("Only the host can decline this request.")
+    if reservation.status != Reservation.Status.REQUESTED:
+        raise ReservationError("Only requested reservations can be declined.")
+
     with transaction.atomic():
-        reservation = Reservation.objects.select_for_update().select_related("listing", "guest", "host").get(pk=reservation_id)
-        if reservation.host_id != actor.id:
-            raise ReservationError("Only the host can decline this request.")
-        if reservation.status != Reservation.Status.REQUESTED:
-            raise ReservationError("Only requested reservations can be declined.")
-        reservation.status = Reservation.Status.DECLINED
-        reservation.save(update_fields=["status", "updated_at"])
+        transition(reservation, Reservation.Status.DECLINED)
         ReservationEvent.objects.create(
             reservation=reservation,
             actor=actor,
@@ -155,17 +213,15 @@ def decline_request(*, reservation_id, actor):
 
 
 def cancel_reservation(*, reservation_id, actor):
+    reservation = Reservation.objects.select_related("listing", "guest", "host").get(pk=reservation_id)
+    if actor.id not in {reservation.guest_id, reservation.host_id}:
+        raise ReservationError("Only reservation participants can cancel.")
+    if reservation.status not in {Reservation.Status.REQUESTED, Reservation.Status.APPROVED}:
+        raise ReservationError("Reservation cannot be canceled in this state.")
+
     with transaction.atomic():
-        reservation = Reservation.objects.select_for_update().select_related("listing", "guest", "host").get(pk=reservation_id)
-        if actor.id not in {reservation.guest_id, reservation.host_id}:
-            raise ReservationError("Only reservation participants can cancel.")
-        if reservation.status not in {Reservation.Status.REQUESTED, Reservation.Status.APPROVED}:
-            raise ReservationError("Reservation cannot be canceled in this state.")
-
-        canceled_at = timezone.now()
-        reservation.status = Reservation.Status.CANCELED
-        reservation.cancellation_fee_usd = _calculate_cancellation_fee(reservation, canceled_at)
-        reservation.save(update_fields=["status", "cancellation_fee_usd", "updated_at"])
+        fee = _calculate_cancellation_fee(reservation, timezone.now())
+        transition(reservation, Reservation.Status.CANCELED, cancellation_fee_usd=fee)
         ReservationEvent.objects.create(
             reservation=reservation,
             actor=actor,
@@ -186,28 +242,137 @@ def cancel_reservation(*, reservation_id, actor):
     return reservation
 
 
-def expire_open_requests():
-    expired = Reservation.objects.filter(
-        status=Reservation.Status.REQUESTED,
-        expires_at__lte=timezone.now(),
-    ).select_related("listing", "guest")
+def _expire_batch(batch_size):
+    """Expire up to ``batch_size`` stale requests; returns the claimed reservations.
 
-    count = 0
-    for reservation in expired:
-        reservation.status = Reservation.Status.EXPIRED
-        reservation.save(update_fields=["status", "updated_at"])
-        ReservationEvent.objects.create(
-            reservation=reservation,
-            actor=None,
-            event_type="request_expired",
-            message="Request expired",
+    Rows are claimed with FOR UPDATE SKIP LOCKED, so concurrent runs split the
+    backlog between them instead of expiring (and notifying) the same rows twice.
+    """
+    table = connection.ops.quote_name(Reservation._meta.db_table)
+    now = timezone.now()
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {table} AS reservation
+                SET status = %s, version = reservation.version + 1, updated_at = %s
+                FROM (
+                    SELECT id FROM {table}
+                    WHERE status = %s AND expires_at <= %s
+                    ORDER BY expires_at
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                ) AS claimed
+                WHERE reservation.id = claimed.id
+                RETURNING reservation.id
+                """,
+                [Reservation.Status.EXPIRED, now, Reservation.Status.REQUESTED, now, batch_size],
+            )
+            expired_ids = [row[0] for row in cursor.fetchall()]
+        if not expired_ids:
+            return []
+
+        expired = list(Reservation.objects.filter(pk__in=expired_ids).select_related("listing", "guest"))
+        ReservationEvent.objects.bulk_create(
+            ReservationEvent(reservation=reservation, actor=None, event_type="request_expired", message="Request expired")
+            for reservation in expired
         )
-        notify_user(
-            reservation.guest,
-            UserNotification.NotificationType.RESERVATION_EXPIRED,
-            "Reservation request expired",
-            f"Your reservation request for {reservation.listing.title} has expired.",
-            payload={"reservation_id": reservation.id},
+        notify_users(
+            (
+                reservation.guest,
+                UserNotification.NotificationType.RESERVATION_EXPIRED,
+                "Reservation request expired",
+                f"Your reservation request for {reservation.listing.title} has expired.",
+                {"reservation_id": reservation.id},
+            )
+            for reservation in expired
         )
-        count += 1
+    return expired
+
+
+def expire_open_requests(batch_size=500, max_seconds=None):
+    """Expire stale requests in batches until none are left or ``max_seconds`` has passed."""
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    count = 0
+    while deadline is None or time.monotonic() < deadline:
+        claimed = len(_expire_batch(batch_size))
+        count += claimed
+        if claimed < batch_size:
+            break
     return count
+
+
+def _decide_requests(reservation_ids, actor, approve):
+    """Approve or decline the actor's requested reservations among ``reservation_ids``.
+
+    Runs in one transaction with bulk event and notification inserts. Returns
+    ``(decided, skipped)``; rows that are no longer requested, have expired or
+    (when approving) would overlap an approved stay are skipped. Approving also
+    declines competing requests, including ones later in the same batch.
+    """
+    if approve:
+        event_type, event_message = "request_approved", "Host approved reservation"
+        notification_type, title, verb = UserNotification.NotificationType.RESERVATION_APPROVED, "Reservation approved", "was approved"
+    else:
+        event_type, event_message = "request_declined", "Host declined reservation"
+        notification_type, title, verb = UserNotification.NotificationType.RESERVATION_DECLINED, "Reservation declined", "was declined"
+
+    reservations = list(
+        Reservation.objects.select_related("listing", "guest")
+        .filter(pk__in=reservation_ids, host=actor)
+        .order_by("pk")
+    )
+    now = timezone.now()
+    skipped = [reservation for reservation in reservations if reservation.status != Reservation.Status.REQUESTED]
+    expired = [reservation for reservation in reservations if reservation not in skipped and reservation.expires_at <= now]
+    pending = [reservation for reservation in reservations if reservation not in skipped and reservation not in expired]
+    skipped += expired
+    decided = []
+
+    with transaction.atomic():
+        bulk_transition([reservation.pk for reservation in expired], Reservation.Status.EXPIRED)
+        if approve:
+            auto_declined = set()
+            for reservation in pending:
+                if reservation.pk in auto_declined:
+                    skipped.append(reservation)
+                    continue
+                try:
+                    transition(reservation, Reservation.Status.APPROVED)
+                except ReservationError:
+                    skipped.append(reservation)
+                    continue
+                decided.append(reservation)
+                auto_declined.update(competitor.pk for competitor in _decline_competing_requests(reservation, actor))
+        else:
+            declined_ids = set(bulk_transition([reservation.pk for reservation in pending], Reservation.Status.DECLINED))
+            for reservation in pending:
+                if reservation.pk in declined_ids:
+                    reservation.status = Reservation.Status.DECLINED
+                    decided.append(reservation)
+                else:
+                    skipped.append(reservation)
+
+        ReservationEvent.objects.bulk_create(
+            ReservationEvent(reservation=reservation, actor=actor, event_type=event_type, message=event_message)
+            for reservation in decided
+        )
+        notify_users(
+            (
+                reservation.guest,
+                notification_type,
+                title,
+                f"Your reservation for {reservation.listing.title} {verb}.",
+                {"reservation_id": reservation.id},
+            )
+            for reservation in decided
+        )
+    return decided, skipped
+
+
+def approve_requests(*, reservation_ids, actor):
+    return _decide_requests(reservation_ids, actor, approve=True)
+
+
+def decline_requests(*, reservation_ids, actor):
+    return _decide_requests(reservation_ids, actor, approve=False)
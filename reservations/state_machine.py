@@ -0,0 +1,121 @@
+"""Reservation status transitions as conditional UPDATEs (optimistic concurrency).
+
+A transition only applies if the row still has the status and ``version`` the
+caller read, so it is one round trip with no row lock held; a lost race shows
+up as zero rows updated and is reported as ``ReservationError``. So does a race
+Postgres settles itself by aborting one side (a deadlock between two
+overlapping approvals, or a serialization failure).
+"""
+
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+
+from reservations.models import STAY_EXCLUSION_CONSTRAINT, Reservation
+
+Status = Reservation.Status
+
+# Postgres SQLSTATEs for a transaction aborted to break a deadlock or a serialization conflict.
+CONFLICT_SQLSTATES = {"40P01", "40001"}
+
+# target status -> statuses it may be reached from
+TRANSITIONS = {
+    Status.APPROVED: {Status.REQUESTED},
+    Status.DECLINED: {Status.REQUESTED},
+    Status.EXPIRED: {Status.REQUESTED},
+    Status.CANCELED: {Status.REQUESTED, Status.APPROVED},
+}
+
+# Sent with ``reservation_ids``, ``source`` (None for bulk) and ``target`` after
+# a transition, since UPDATEs bypass post_save.
+status_changed = Signal()
+
+
+class ReservationError(Exception):
+    pass
+
+
+def _violates(exc: IntegrityError, constraint_name) -> bool:
+    diag = getattr(exc.__cause__, "diag", None)
+    return getattr(diag, "constraint_name", None) == constraint_name
+
+
+def _conflicted(exc: OperationalError) -> bool:
+    diag = getattr(exc.__cause__, "diag", None)
+    return getattr(diag, "sqlstate", None) in CONFLICT_SQLSTATES
+
+
+def _occupancy_changes(source, target):
+    return Status.APPROVED in (source, target)
+
+
+def transition(reservation, target, **changes):
+    """Move ``reservation`` to ``target`` if nobody changed it since it was read."""
+    source = reservation.status
+    if source not in TRANSITIONS.get(target, ()):
+        raise ReservationError(f"A {source} reservation cannot become {target}.")
+
+    from listings.occupancy import refresh_listing_occupancy
+
+    try:
+        with transaction.atomic():
+            updated = Reservation.objects.filter(pk=reservation.pk, status=source, version=reservation.version).update(
+                status=target,
+                version=F("version") + 1,
+                updated_at=timezone.now(),
+                **changes,
+            )
+            if not updated:
+                raise ReservationError("This reservation was just changed by someone else. Reload and try again.")
+            if _occupancy_changes(source, target):
+                refresh_listing_occupancy(reservation.listing_id, reservation.check_in, reservation.check_out)
+    except IntegrityError as exc:
+        if _violates(exc, STAY_EXCLUSION_CONSTRAINT):
+            raise ReservationError("Another approved reservation overlaps these dates.") from exc
+        raise
+    except OperationalError as exc:
+        if _conflicted(exc):
+            raise ReservationError("This reservation was just changed by someone else. Reload and try again.") from exc
+        raise
+
+    reservation.status = target
+    reservation.version += 1
+    for name, value in changes.items():
+        setattr(reservation, name, value)
+    status_changed.send(sender=Reservation, reservation_ids=[reservation.pk], source=source, target=target)
+    return reservation
+
+
+def bulk_transition(reservation_ids, target):
+    """Move every listed reservation still in an allowed source status; returns the IDs moved.
+
+    Not for transitions that change occupancy: those go one row at a time
+    through ``transition`` so each can hit the exclusion constraint on its own.
+    """
+    if not reservation_ids:
+        return []
+    sources = TRANSITIONS[target]
+    if any(_occupancy_changes(source, target) for source in sources):
+        raise ValueError(f"Use transition() for moves to {target}")
+
+    table = connection.ops.quote_name(Reservation._meta.db_table)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {table}
+                SET status = %s, version = version + 1, updated_at = %s
+                WHERE id = ANY(%s) AND status = ANY(%s)
+                RETURNING id
+                """,
+                [target, timezone.now(), list(reservation_ids), [str(source) for source in sources]],
+            )
+            moved = [row[0] for row in cursor.fetchall()]
+    except OperationalError as exc:
+        if _conflicted(exc):
+            raise ReservationError("These reservations were just changed by someone else. Reload and try again.") from exc
+        raise
+    if moved:
+        status_changed.send(sender=Reservation, reservation_ids=moved, source=None, target=target)
+    return moved
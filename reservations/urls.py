@@ -1,12 +1,20 @@
 from django.urls import path
 
-from reservations.views import approve_reservation, cancel_reservation_view, decline_reservation, request_reservation
+from reservations.views import (
+    approve_reservation,
+    batch_decide_reservations,
+    cancel_reservation_view,
+    decline_reservation,
+    request_reservation,
+)
 
 app_name = "reservations"
 
 urlpatterns = [
     path("request", request_reservation),
     path("request/", request_reservation, name="request"),
+    path("batch", batch_decide_reservations),
+    path("batch/", batch_decide_reservations, name="batch"),
     path("<int:pk>/approve", approve_reservation),
     path("<int:pk>/approve/", approve_reservation, name="approve"),
     path("<int:pk>/decline", decline_reservation),
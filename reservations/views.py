@@ -3,8 +3,16 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect
 
 from listings.models import Listing
-from reservations.forms import ReservationRequestForm
-from reservations.services import ReservationError, approve_request, cancel_reservation, create_request, decline_request
+from reservations.forms import BatchDecisionForm, ReservationRequestForm
+from reservations.services import (
+    ReservationError,
+    approve_request,
+    approve_requests,
+    cancel_reservation,
+    create_request,
+    decline_request,
+    decline_requests,
+)
 
 
 @login_required
@@ -41,8 +49,15 @@ def approve_reservation(request, pk):
     if request.method != "POST":
         return redirect("accounts:host_reservations")
     try:
-        approve_request(reservation_id=pk, actor=request.user)
-        messages.success(request, "Reservation approved.")
+        reservation = approve_request(reservation_id=pk, actor=request.user)
+        declined = len(reservation.declined_competitors)
+        if declined:
+            messages.success(
+                request,
+                f"Reservation approved. {declined} overlapping request{'s were' if declined != 1 else ' was'} declined.",
+            )
+        else:
+            messages.success(request, "Reservation approved.")
     except ReservationError as exc:
         messages.error(request, str(exc))
     return redirect("accounts:host_reservations")
@@ -60,6 +75,29 @@ def decline_reservation(request, pk):
     return redirect("accounts:host_reservations")
 
 
+@login_required
+def batch_decide_reservations(request):
+    if request.method != "POST":
+        return redirect("accounts:host_reservations")
+    back = request.META.get("HTTP_REFERER", "accounts:host_reservations")
+    form = BatchDecisionForm(request.POST)
+    if not form.is_valid():
+        messages.error(request, "Select at least one request to approve or decline.")
+        return redirect(back)
+
+    decide = approve_requests if form.cleaned_data["action"] == "approve" else decline_requests
+    decided, skipped = decide(reservation_ids=form.cleaned_data["reservation_ids"], actor=request.user)
+    verb = "approved" if form.cleaned_data["action"] == "approve" else "declined"
+    if decided:
+        messages.success(request, f"{len(decided)} reservation{'s' if len(decided) != 1 else ''} {verb}.")
+    if skipped:
+        messages.error(
+            request,
+            f"{len(skipped)} could not be {verb}: no longer pending, expired, or overlapping an approved stay.",
+        )
+    return redirect(back)
+
+
 @login_required
 def cancel_reservation_view(request, pk):
     if request.method != "POST":
@@ -1,17 +1,45 @@
+import datetime
+
 from django import forms
+from django.db import models
+from django.utils import timezone
 
-from listings.models import Listing
+from listings.models import Amenity, Listing
 
 _input = "form-input"
 _select = "form-select"
 
+MAX_FLEXIBLE_STAY_NIGHTS = 28
+
+
+def flexible_window(cleaned_data):
+    """``(start, end)`` to find ``stay_nights`` free nights in: the month if given, else the dates."""
+    month = cleaned_data.get("month")
+    if month:
+        return month, (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    check_in, check_out = cleaned_data.get("check_in"), cleaned_data.get("check_out")
+    if check_in and check_out and check_in < check_out:
+        return check_in, check_out
+    return None
+
 
 class SearchForm(forms.Form):
+    class Sort(models.TextChoices):
+        NEWEST = "newest", "Newest"
+        PRICE_ASC = "price_asc", "Price: low to high"
+        PRICE_DESC = "price_desc", "Price: high to low"
+        DISTANCE = "distance", "Nearest first"
+
     q = forms.CharField(
         required=False,
         label="Location",
         widget=forms.TextInput(attrs={"class": _input, "placeholder": "City or neighborhood"}),
     )
+    keywords = forms.CharField(
+        required=False,
+        max_length=200,
+        widget=forms.TextInput(attrs={"class": _input, "placeholder": "Lake cabin, hot tub..."}),
+    )
     check_in = forms.DateField(
         required=False,
         widget=forms.DateInput(attrs={"class": _input, "type": "date"}),
@@ -20,6 +48,19 @@ class SearchForm(forms.Form):
         required=False,
         widget=forms.DateInput(attrs={"class": _input, "type": "date"}),
     )
+    month = forms.DateField(
+        required=False,
+        input_formats=["%Y-%m"],
+        label="Flexible month",
+        widget=forms.DateInput(attrs={"class": _input, "type": "month"}, format="%Y-%m"),
+    )
+    stay_nights = forms.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=MAX_FLEXIBLE_STAY_NIGHTS,
+        label="Nights",
+        widget=forms.NumberInput(attrs={"class": _input, "placeholder": "Nights"}),
+    )
     guests = forms.IntegerField(
         required=False,
         min_value=1,
@@ -40,6 +81,11 @@ class SearchForm(forms.Form):
         choices=[("", "Any type")] + list(Listing.PropertyType.choices),
         widget=forms.Select(attrs={"class": _select}),
     )
+    amenities = forms.ModelMultipleChoiceField(
+        required=False,
+        queryset=Amenity.objects.all(),
+        widget=forms.CheckboxSelectMultiple,
+    )
     radius_km = forms.IntegerField(
         required=False,
         min_value=1,
@@ -47,3 +93,23 @@ class SearchForm(forms.Form):
         initial=25,
         widget=forms.NumberInput(attrs={"class": _input, "placeholder": "Radius km"}),
     )
+    sort = forms.ChoiceField(
+        required=False,
+        choices=[("", "Best match")] + list(Sort.choices),
+        widget=forms.Select(attrs={"class": _select}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        stay_nights = cleaned_data.get("stay_nights")
+        if not stay_nights:
+            return cleaned_data
+
+        window = flexible_window(cleaned_data)
+        if window is None:
+            raise forms.ValidationError("Pick a month or a date range to search flexible dates.")
+        if window[1] <= timezone.localdate():
+            raise forms.ValidationError("Pick a month or date range that has not ended yet.")
+        if (window[1] - window[0]).days < stay_nights:
+            raise forms.ValidationError("The date range is shorter than the stay.")
+        return cleaned_data
@@ -0,0 +1,511 @@
+import datetime
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import GeometryDistance
+from django.contrib.gis.geos import Point, Polygon
+from django.contrib.gis.measure import D
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import (
+    Avg,
+    BooleanField,
+    Case,
+    Count,
+    DateField,
+    F,
+    FloatField,
+    Func,
+    Min,
+    Q,
+    QuerySet,
+    Value,
+    When,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Floor
+from django.utils import timezone
+
+from core.cache import bump_version, current_version, get_or_compute
+from core.geocode import UNAVAILABLE, geocode_city
+from core.pagination import bounded_count, paginate_keyset
+from listings.models import Amenity, AvailabilityBlock, Listing
+from listings.occupancy import covers, occupied_listing_ids
+from listings.rules import rule_nights_sql
+from reservations.models import Reservation
+from search.forms import SearchForm, flexible_window
+
+SEARCH_ORDERING = ["-created_at", "-id"]
+RELEVANCE_ORDERING = ["-rank", "-id"]
+SORT_ORDERINGS = {
+    SearchForm.Sort.NEWEST: SEARCH_ORDERING,
+    SearchForm.Sort.PRICE_ASC: ["nightly_rate_usd", "id"],
+    SearchForm.Sort.PRICE_DESC: ["-nightly_rate_usd", "-id"],
+    # GeometryDistance compiles to the KNN "<->" operator, so the GiST index
+    # on location returns rows nearest-first and the page LIMIT stops the scan.
+    SearchForm.Sort.DISTANCE: ["distance", "id"],
+}
+SEARCH_VERSION_KEY = "search:version"
+
+# At or below this zoom level the map gets grid clusters instead of pins.
+MAP_CLUSTER_MAX_ZOOM = 11
+# Cluster grid cells per 256px map tile edge.
+MAP_CLUSTER_CELLS_PER_TILE = 6
+MAP_PIN_LIMIT = 500
+
+# Lower edges of the price histogram buckets; the last bucket is open-ended.
+FACET_PRICE_EDGES = [0, 50, 100, 150, 200, 300, 500]
+# Bedroom facet values; the last one means "this many or more".
+FACET_BEDROOMS = [0, 1, 2, 3, 4]
+
+LOCATION_SUGGESTION_LIMIT = 8
+# Per-process cache of autocomplete answers keyed by normalized prefix.
+LOCATION_SUGGESTION_CACHE_SIZE = 1024
+LOCATION_SUGGESTION_CACHE_TTL = 60
+_location_suggestion_cache = OrderedDict()
+_location_suggestion_lock = threading.Lock()
+
+# Default for ``geocoded`` arguments: resolve the location here. Async views
+# geocode up front and pass the result (possibly None) instead.
+_GEOCODE = object()
+
+
+class _Longitude(Func):
+    function = "ST_X"
+    template = "%(function)s(%(expressions)s::geometry)"
+    output_field = FloatField()
+
+
+class _Latitude(Func):
+    function = "ST_Y"
+    template = "%(function)s(%(expressions)s::geometry)"
+    output_field = FloatField()
+
+
+def searchable_listings():
+    return Listing.objects.filter(
+        status=Listing.Status.PUBLISHED,
+        host__host_profile__status="approved",
+    )
+
+
+def _earliest_free_run(start, end, nights):
+    """First check-in in ``[start, end)`` that starts ``nights`` consecutive free nights.
+
+    Per listing, the window minus the range_agg of its blocks, approved stays
+    and rule-closed nights leaves a multirange of free runs; unnest it and keep
+    the first run that is long enough. One correlated subquery, no per-window
+    probing.
+    """
+    blocks = AvailabilityBlock._meta.db_table
+    reservations = Reservation._meta.db_table
+    listings = Listing._meta.db_table
+    rule_nights, rule_params = rule_nights_sql(f"{listings}.id", start, end)
+    sql = f"""
+        SELECT MIN(lower(free.span))
+        FROM unnest(
+            datemultirange(daterange(%s, %s)) - COALESCE(
+                (
+                    SELECT range_agg(busy.span)
+                    FROM (
+                        SELECT daterange(block.start_date, block.end_date) AS span
+                        FROM {blocks} block
+                        WHERE block.listing_id = {listings}.id AND block.start_date < %s AND block.end_date > %s
+                        UNION ALL
+                        SELECT daterange(stay.check_in, stay.check_out)
+                        FROM {reservations} stay
+                        WHERE stay.listing_id = {listings}.id AND stay.status = %s
+                            AND stay.check_in < %s AND stay.check_out > %s
+                        UNION ALL
+                        {rule_nights}
+                    ) busy
+                ),
+                '{{}}'::datemultirange
+            )
+        ) AS free(span)
+        WHERE upper(free.span) - lower(free.span) >= %s
+    """
+    params = (start, end, end, start, Reservation.Status.APPROVED, end, start, *rule_params, nights)
+    return RawSQL(sql, params, output_field=DateField())
+
+
+def search_queryset(cleaned_data, geocoded=_GEOCODE):
+    queryset = searchable_listings()
+
+    if cleaned_data.get("property_type"):
+        queryset = queryset.filter(property_type=cleaned_data["property_type"])
+
+    if cleaned_data.get("min_price") is not None:
+        queryset = queryset.filter(nightly_rate_usd__gte=cleaned_data["min_price"])
+
+    if cleaned_data.get("max_price") is not None:
+        queryset = queryset.filter(nightly_rate_usd__lte=cleaned_data["max_price"])
+
+    if cleaned_data.get("guests"):
+        queryset = queryset.filter(max_guests__gte=cleaned_data["guests"])
+
+    if cleaned_data.get("amenities"):
+        queryset = queryset.filter(amenity_ids__contains=sorted(amenity.pk for amenity in cleaned_data["amenities"]))
+
+    keywords = cleaned_data.get("keywords")
+    if keywords:
+        query = SearchQuery(keywords, search_type="websearch", config="english")
+        # ts_rank is a float4; casting keeps cursor values exact when they round-trip through JSON.
+        queryset = queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+        )
+
+    location_query = cleaned_data.get("q")
+    radius_km = cleaned_data.get("radius_km") or 25
+    if geocoded is _GEOCODE:
+        geocoded = geocode_city(location_query) if location_query else None
+
+    if geocoded:
+        center = Point(geocoded["lon"], geocoded["lat"], srid=4326)
+        queryset = queryset.filter(location__distance_lte=(center, D(km=radius_km)))
+        if cleaned_data.get("sort") == SearchForm.Sort.DISTANCE:
+            queryset = queryset.annotate(distance=GeometryDistance("location", center))
+    elif location_query:
+        # No coordinates (unknown place or geocoder down): match the text instead of dropping it.
+        queryset = queryset.filter(
+            Q(city__iexact=location_query.split(",")[0].strip())
+            | Q(search_vector=SearchQuery(location_query, config="english"))
+        )
+
+    check_in = cleaned_data.get("check_in")
+    check_out = cleaned_data.get("check_out")
+    stay_nights = cleaned_data.get("stay_nights")
+    window = flexible_window(cleaned_data) if stay_nights else None
+
+    if window:
+        start, end = max(window[0], timezone.localdate()), window[1]
+        if start >= end:
+            return queryset.none(), geocoded
+        queryset = queryset.annotate(flexible_check_in=_earliest_free_run(start, end, stay_nights)).filter(
+            flexible_check_in__isnull=False
+        )
+    elif check_in and check_out and check_in < check_out and covers(check_in, check_out):
+        queryset = queryset.exclude(id__in=occupied_listing_ids(check_in, check_out))
+    elif check_in and check_out and check_in < check_out:
+        blocked_listing_ids = AvailabilityBlock.objects.filter(
+            start_date__lt=check_out,
+            end_date__gt=check_in,
+        ).values_list("listing_id", flat=True)
+        reserved_listing_ids = Reservation.objects.filter(
+            status=Reservation.Status.APPROVED,
+            check_in__lt=check_out,
+            check_out__gt=check_in,
+        ).values_list("listing_id", flat=True)
+        rule_nights, rule_params = rule_nights_sql(f"{Listing._meta.db_table}.id", check_in, check_out)
+        queryset = queryset.exclude(Q(id__in=blocked_listing_ids) | Q(id__in=reserved_listing_ids)).alias(
+            rule_closed=RawSQL(f"EXISTS ({rule_nights})", rule_params, output_field=BooleanField())
+        ).filter(rule_closed=False)
+
+    return queryset, geocoded or None
+
+
+def search_ordering(cleaned_data, geocoded=None):
+    sort = cleaned_data.get("sort")
+    if sort == SearchForm.Sort.DISTANCE and not geocoded:
+        sort = None
+    if sort:
+        return SORT_ORDERINGS[sort]
+    if cleaned_data.get("keywords"):
+        return RELEVANCE_ORDERING
+    return SEARCH_ORDERING
+
+
+def normalize_filters(cleaned_data):
+    normalized = {}
+    for name, value in cleaned_data.items():
+        if value is None or value == "":
+            continue
+        if isinstance(value, str):
+            value = " ".join(value.split()).lower()
+        elif isinstance(value, Decimal):
+            value = format(value.normalize(), "f")
+        elif isinstance(value, QuerySet):
+            if not value:
+                continue
+            value = sorted(obj.pk for obj in value)
+        else:
+            value = str(value)
+        normalized[name] = value
+    return normalized
+
+
+def search_cache_key(kind, cleaned_data, *extra):
+    raw = json.dumps([normalize_filters(cleaned_data), extra], sort_keys=True)
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f"search:{kind}:{current_version(SEARCH_VERSION_KEY)}:{digest}"
+
+
+def invalidate_search_cache():
+    bump_version(SEARCH_VERSION_KEY)
+
+
+def _resolve_geocode(cleaned_data, geocoded):
+    if geocoded is _GEOCODE:
+        query = cleaned_data.get("q")
+        return geocode_city(query) if query else None
+    return geocoded
+
+
+def _search_cached(key, compute, geocoded):
+    """``get_or_compute`` with the search TTL, skipped while the geocoder is unavailable.
+
+    Text-fallback results would otherwise keep being served after it recovers.
+    """
+    if geocoded is UNAVAILABLE:
+        return compute()
+    return get_or_compute(key, compute, ttl=getattr(settings, "COVACH_SEARCH_CACHE_TTL", 60))
+
+
+def _hydrate(listing_ids):
+    by_id = Listing.objects.prefetch_related("photos").in_bulk(listing_ids)
+    return [by_id[pk] for pk in listing_ids if pk in by_id]
+
+
+def search_page(cleaned_data, cursor=None, geocoded=_GEOCODE):
+    """Return one page of results; only listing IDs are cached, never model instances."""
+    geocoded = _resolve_geocode(cleaned_data, geocoded)
+    computed = {}
+
+    def compute():
+        queryset, location = search_queryset(cleaned_data, geocoded)
+        page = paginate_keyset(
+            queryset.prefetch_related("photos"),
+            search_ordering(cleaned_data, location),
+            cursor=cursor,
+            page_size=getattr(settings, "COVACH_SEARCH_PAGE_SIZE", 20),
+        )
+        computed["listings"] = page.items
+        result = {
+            "ids": [listing.id for listing in page.items],
+            "next_cursor": page.next_cursor,
+            "geocoded": location,
+            "count": None,
+            # Annotations do not survive the ID-only cache, so keep the flexible-date matches alongside.
+            "check_ins": {listing.id: getattr(listing, "flexible_check_in", None) for listing in page.items},
+        }
+        if not cursor:
+            result["count"] = bounded_count(queryset, getattr(settings, "COVACH_SEARCH_COUNT_LIMIT", 1000))
+        return result
+
+    result = _search_cached(search_cache_key("page", cleaned_data, cursor), compute, geocoded)
+    listings = computed["listings"] if "listings" in computed else _hydrate(result["ids"])
+    stay_nights = cleaned_data.get("stay_nights")
+    for listing in listings:
+        listing.flexible_check_in = result["check_ins"].get(listing.id)
+        if listing.flexible_check_in and stay_nights:
+            listing.flexible_check_out = listing.flexible_check_in + datetime.timedelta(days=stay_nights)
+    return {**result, "listings": listings}
+
+
+def parse_bbox(raw):
+    """Parse ``west,south,east,north``; returns None for anything unusable."""
+    try:
+        west, south, east, north = (float(part) for part in (raw or "").split(","))
+    except ValueError:
+        return None
+    if not all(math.isfinite(edge) for edge in (west, south, east, north)):
+        return None
+    west, east = max(west, -180.0), min(east, 180.0)
+    south, north = max(south, -90.0), min(north, 90.0)
+    if west >= east or south >= north:
+        return None
+    return west, south, east, north
+
+
+def _pin_columns(rows):
+    ids, slugs, titles, prices, lats, lons = list(zip(*rows)) or [()] * 6
+    return {
+        "mode": "pins",
+        "id": list(ids),
+        "slug": list(slugs),
+        "title": list(titles),
+        "price": [str(price) for price in prices],
+        "lat": list(lats),
+        "lon": list(lons),
+    }
+
+
+def empty_map_payload():
+    return _pin_columns([])
+
+
+def _map_pins(queryset):
+    rows = queryset.annotate(lon=_Longitude("location"), lat=_Latitude("location")).values_list(
+        "id", "slug", "title", "nightly_rate_usd", "lat", "lon"
+    )
+    return _pin_columns(rows[:MAP_PIN_LIMIT])
+
+
+def _map_clusters(queryset, zoom):
+    cell = 360.0 / (2**zoom) / MAP_CLUSTER_CELLS_PER_TILE
+    rows = (
+        queryset.annotate(
+            cell_x=Floor(_Longitude("location") / cell),
+            cell_y=Floor(_Latitude("location") / cell),
+        )
+        .values("cell_x", "cell_y")
+        .annotate(
+            total=Count("id"),
+            lat=Avg(_Latitude("location")),
+            lon=Avg(_Longitude("location")),
+            min_price=Min("nightly_rate_usd"),
+        )
+        .order_by()
+        .values_list("total", "lat", "lon", "min_price")
+    )
+    counts, lats, lons, min_prices = list(zip(*rows)) or [()] * 4
+    return {
+        "mode": "clusters",
+        "count": list(counts),
+        "lat": list(lats),
+        "lon": list(lons),
+        "min_price": [str(price) for price in min_prices],
+    }
+
+
+def map_payload(cleaned_data, bbox=None, zoom=None, geocoded=_GEOCODE):
+    """Columnar map markers for the viewport: raw pins when zoomed in, grid clusters otherwise."""
+    geocoded = _resolve_geocode(cleaned_data, geocoded)
+
+    def compute():
+        queryset, _ = search_queryset(cleaned_data, geocoded)
+        queryset = queryset.filter(location__isnull=False)
+        if bbox:
+            queryset = queryset.filter(location__intersects=Polygon.from_bbox(bbox))
+        if zoom is not None and zoom <= MAP_CLUSTER_MAX_ZOOM:
+            return _map_clusters(queryset, zoom)
+        return _map_pins(queryset)
+
+    rounded_bbox = [round(edge, 4) for edge in bbox] if bbox else None
+    return _search_cached(search_cache_key("map", cleaned_data, rounded_bbox, zoom), compute, geocoded)
+
+
+def _facet_aggregates(amenities):
+    aggregates = {}
+    for value, _ in Listing.PropertyType.choices:
+        aggregates[f"type_{value}"] = Count("pk", filter=Q(property_type=value))
+    for bedrooms in FACET_BEDROOMS:
+        lookup = "bedrooms__gte" if bedrooms == FACET_BEDROOMS[-1] else "bedrooms"
+        aggregates[f"bedrooms_{bedrooms}"] = Count("pk", filter=Q(**{lookup: bedrooms}))
+    for index, lower in enumerate(FACET_PRICE_EDGES):
+        bucket = Q(nightly_rate_usd__gte=lower)
+        if index + 1 < len(FACET_PRICE_EDGES):
+            bucket &= Q(nightly_rate_usd__lt=FACET_PRICE_EDGES[index + 1])
+        aggregates[f"price_{index}"] = Count("pk", filter=bucket)
+    for pk, _ in amenities:
+        aggregates[f"amenity_{pk}"] = Count("pk", filter=Q(amenity_ids__contains=[pk]))
+    return aggregates
+
+
+def search_facets(cleaned_data, geocoded=_GEOCODE):
+    """Counts per property type, bedroom count and amenity plus a price histogram.
+
+    Every facet is a ``COUNT(*) FILTER (...)`` over the current search filters,
+    so the whole sidebar costs one aggregate query per distinct filter set.
+    """
+    filters = {name: value for name, value in cleaned_data.items() if name != "sort"}
+    geocoded = _resolve_geocode(cleaned_data, geocoded)
+
+    def compute():
+        queryset, _ = search_queryset(filters, geocoded)
+        amenities = list(Amenity.objects.values_list("pk", "name"))
+        totals = queryset.order_by().aggregate(**_facet_aggregates(amenities))
+
+        prices = []
+        for index, lower in enumerate(FACET_PRICE_EDGES):
+            upper = FACET_PRICE_EDGES[index + 1] if index + 1 < len(FACET_PRICE_EDGES) else None
+            prices.append({"min": lower, "max": upper, "count": totals[f"price_{index}"]})
+        tallest = max(bucket["count"] for bucket in prices) or 1
+        for bucket in prices:
+            bucket["height"] = round(100 * bucket["count"] / tallest)
+
+        return {
+            "property_types": [
+                {"value": value, "label": label, "count": totals[f"type_{value}"]}
+                for value, label in Listing.PropertyType.choices
+            ],
+            "bedrooms": [
+                {"value": bedrooms, "plus": bedrooms == FACET_BEDROOMS[-1], "count": totals[f"bedrooms_{bedrooms}"]}
+                for bedrooms in FACET_BEDROOMS
+            ],
+            "amenities": sorted(
+                (
+                    {"value": pk, "label": name, "count": totals[f"amenity_{pk}"]}
+                    for pk, name in amenities
+                    if totals[f"amenity_{pk}"]
+                ),
+                key=lambda facet: -facet["count"],
+            ),
+            "prices": prices,
+        }
+
+    return _search_cached(search_cache_key("facets", filters), compute, geocoded)
+
+
+def _location_matches(field, prefix, group_by):
+    # trigram_word_similar ("<%") is served by the pg_trgm GIN index and also
+    # tolerates typos; exact prefix matches are still ranked ahead of fuzzy ones.
+    return (
+        searchable_listings()
+        .filter(**{f"{field}__trigram_word_similar": prefix})
+        .exclude(**{field: ""})
+        .values(*group_by)
+        .annotate(
+            count=Count("pk"),
+            is_prefix=Case(
+                When(**{f"{field}__istartswith": prefix}, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+            similarity=TrigramWordSimilarity(prefix, field),
+        )
+        .order_by("-is_prefix", "-count", "-similarity")[:LOCATION_SUGGESTION_LIMIT]
+    )
+
+
+def _query_location_suggestions(prefix):
+    suggestions = [
+        {"kind": "city", "label": ", ".join(part for part in (row["city"], row["region"]) if part), **row}
+        for row in _location_matches("city", prefix, ["city", "region", "country"])
+    ]
+    suggestions += [
+        {"kind": "region", "label": ", ".join(part for part in (row["region"], row["country"]) if part), **row}
+        for row in _location_matches("region", prefix, ["region", "country"])
+    ]
+    suggestions.sort(key=lambda suggestion: (not suggestion["is_prefix"], -suggestion["count"], -suggestion["similarity"]))
+    return [
+        {"kind": suggestion["kind"], "label": suggestion["label"], "count": suggestion["count"]}
+        for suggestion in suggestions[:LOCATION_SUGGESTION_LIMIT]
+    ]
+
+
+def location_suggestions(prefix):
+    """Cities and regions with published listings matching ``prefix``, most listings first."""
+    prefix = " ".join((prefix or "").split()).lower()
+    if len(prefix) < 2:
+        return []
+
+    now = time.monotonic()
+    with _location_suggestion_lock:
+        cached = _location_suggestion_cache.get(prefix)
+        if cached and cached[0] > now:
+            _location_suggestion_cache.move_to_end(prefix)
+            return cached[1]
+
+    suggestions = _query_location_suggestions(prefix)
+    with _location_suggestion_lock:
+        _location_suggestion_cache[prefix] = (now + LOCATION_SUGGESTION_CACHE_TTL, suggestions)
+        _location_suggestion_cache.move_to_end(prefix)
+        while len(_location_suggestion_cache) > LOCATION_SUGGESTION_CACHE_SIZE:
+            _location_suggestion_cache.popitem(last=False)
+    return suggestions
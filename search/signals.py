@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import HostProfile
+from listings.models import AvailabilityBlock, AvailabilityRule, Listing
+from reservations.models import Reservation
+from reservations.state_machine import status_changed
+from search.services import invalidate_search_cache
+
+
+def _touches(update_fields, *names):
+    return update_fields is None or bool(set(names) & set(update_fields))
+
+
+def _invalidate():
+    # Bump after commit so no request can re-cache rows this transaction is replacing.
+    transaction.on_commit(invalidate_search_cache)
+
+
+@receiver(post_save, sender=Listing)
+@receiver(post_delete, sender=Listing)
+@receiver(post_save, sender=AvailabilityBlock)
+@receiver(post_delete, sender=AvailabilityBlock)
+@receiver(post_save, sender=AvailabilityRule)
+@receiver(post_delete, sender=AvailabilityRule)
+def _listing_changed(sender, **kwargs):
+    _invalidate()
+
+
+@receiver(m2m_changed, sender=Listing.amenities.through)
+def _listing_amenities_changed(sender, action, **kwargs):
+    if action.startswith("post_"):
+        _invalidate()
+
+
+@receiver(post_save, sender=Reservation)
+def _reservation_saved(sender, instance, update_fields=None, **kwargs):
+    if instance.status in Reservation.OCCUPANCY_STATUSES and _touches(update_fields, "status", "check_in", "check_out"):
+        _invalidate()
+
+
+@receiver(post_delete, sender=Reservation)
+def _reservation_deleted(sender, instance, **kwargs):
+    if instance.status == Reservation.Status.APPROVED:
+        _invalidate()
+
+
+@receiver(status_changed, sender=Reservation)
+def _reservation_transitioned(sender, source, target, **kwargs):
+    if Reservation.Status.APPROVED in (source, target):
+        _invalidate()
+
+
+@receiver(post_save, sender=HostProfile)
+def _host_profile_saved(sender, update_fields=None, **kwargs):
+    if _touches(update_fields, "status"):
+        _invalidate()
@@ -1,6 +1,12 @@
 from django.urls import path
 
-from search.views import home, htmx_map_payload, htmx_results_partial, search_results
+from search.views import (
+    home,
+    htmx_location_suggestions,
+    htmx_map_payload,
+    htmx_results_partial,
+    search_results,
+)
 
 app_name = "search"
 
@@ -12,4 +18,6 @@ urlpatterns = [
     path("hx/search/results/", htmx_results_partial, name="hx_results"),
     path("hx/search/map", htmx_map_payload),
     path("hx/search/map/", htmx_map_payload, name="hx_map"),
+    path("hx/search/locations", htmx_location_suggestions),
+    path("hx/search/locations/", htmx_location_suggestions, name="hx_locations"),
 ]
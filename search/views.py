@@ -1,57 +1,22 @@
-from django.contrib.gis.geos import Point
-from django.contrib.gis.measure import D
-from django.db.models import Q
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import connections
 from django.http import JsonResponse
 from django.shortcuts import render
+from django.views.decorators.cache import cache_control
 
-from core.geocode import geocode_city
-from listings.models import AvailabilityBlock, Listing
-from reservations.models import Reservation
+from core.geocode import ageocode_city
+from listings.models import Listing
 from search.forms import SearchForm
-
-
-def _search_queryset(cleaned_data):
-    queryset = Listing.objects.filter(
-        status=Listing.Status.PUBLISHED,
-        host__host_profile__status="approved",
-    ).prefetch_related("photos")
-
-    if cleaned_data.get("property_type"):
-        queryset = queryset.filter(property_type=cleaned_data["property_type"])
-
-    if cleaned_data.get("min_price") is not None:
-        queryset = queryset.filter(nightly_rate_usd__gte=cleaned_data["min_price"])
-
-    if cleaned_data.get("max_price") is not None:
-        queryset = queryset.filter(nightly_rate_usd__lte=cleaned_data["max_price"])
-
-    if cleaned_data.get("guests"):
-        queryset = queryset.filter(max_guests__gte=cleaned_data["guests"])
-
-    location_query = cleaned_data.get("q")
-    radius_km = cleaned_data.get("radius_km") or 25
-    geocoded = geocode_city(location_query) if location_query else None
-
-    if geocoded:
-        center = Point(geocoded["lon"], geocoded["lat"], srid=4326)
-        queryset = queryset.filter(location__distance_lte=(center, D(km=radius_km)))
-
-    check_in = cleaned_data.get("check_in")
-    check_out = cleaned_data.get("check_out")
-
-    if check_in and check_out and check_in < check_out:
-        blocked_listing_ids = AvailabilityBlock.objects.filter(
-            start_date__lt=check_out,
-            end_date__gt=check_in,
-        ).values_list("listing_id", flat=True)
-        reserved_listing_ids = Reservation.objects.filter(
-            status=Reservation.Status.APPROVED,
-            check_in__lt=check_out,
-            check_out__gt=check_in,
-        ).values_list("listing_id", flat=True)
-        queryset = queryset.exclude(Q(id__in=blocked_listing_ids) | Q(id__in=reserved_listing_ids))
-
-    return queryset, geocoded
+from search.services import (
+    empty_map_payload,
+    location_suggestions,
+    map_payload,
+    parse_bbox,
+    search_facets,
+    search_page,
+)
 
 
 def home(request):
@@ -60,44 +25,102 @@ def home(request):
     return render(request, "search/home.html", {"form": form, "listings": listings})
 
 
-def search_results(request):
-    form = SearchForm(request.GET or None)
-    listings = Listing.objects.none()
-    geocoded = None
-    if form.is_valid():
-        listings, geocoded = _search_queryset(form.cleaned_data)
-    context = {"form": form, "listings": listings, "geocoded": geocoded}
-    return render(request, "search/results.html", context)
-
-
-def htmx_results_partial(request):
-    form = SearchForm(request.GET or None)
-    listings = Listing.objects.none()
-    geocoded = None
-    if form.is_valid():
-        listings, geocoded = _search_queryset(form.cleaned_data)
-    return render(request, "partials/search_results_list.html", {"listings": listings, "geocoded": geocoded})
-
-
-def htmx_map_payload(request):
+def _page_pins(listings):
+    return [
+        {
+            "id": listing.id,
+            "title": listing.title,
+            "slug": listing.slug,
+            "lat": listing.location.y,
+            "lon": listing.location.x,
+            "price": str(listing.nightly_rate_usd),
+            "city": listing.city,
+        }
+        for listing in listings
+        if listing.location
+    ]
+
+
+def _on_own_connection(func):
+    """``sync_to_async`` on a worker thread with its own database connection, closed when ``func`` returns.
+
+    Calls on the shared thread-sensitive executor run one at a time, so this is
+    how a query overlaps with them.
+    """
+
+    def call(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+
+    return sync_to_async(call, thread_sensitive=False)
+
+
+async def _search_page_context(request, form, geocoded):
+    context = {"form": form, "listings": [], "pins": [], "geocoded": None, "next_query": None, "total_count": None}
+    if not form.is_valid():
+        return context
+
+    cursor = request.GET.get("cursor")
+    page_query = sync_to_async(search_page)(form.cleaned_data, cursor=cursor, geocoded=geocoded)
+    if cursor:
+        page, facets = await page_query, None
+    else:
+        # Only the first page shows facets; their aggregates run alongside the page query.
+        page, facets = await asyncio.gather(page_query, _on_own_connection(search_facets)(form.cleaned_data, geocoded=geocoded))
+    context.update(listings=page["listings"], pins=_page_pins(page["listings"]), geocoded=page["geocoded"])
+    if page["next_cursor"]:
+        params = request.GET.copy()
+        params["cursor"] = page["next_cursor"]
+        context["next_query"] = params.urlencode()
+    if page["count"] is not None:
+        context["total_count"], context["count_capped"] = page["count"]
+        context["facets"] = facets
+    return context
+
+
+async def _validate_and_geocode(request):
     form = SearchForm(request.GET or None)
-    listings = Listing.objects.none()
-    if form.is_valid():
-        listings, _ = _search_queryset(form.cleaned_data)
-
-    payload = []
-    for listing in listings:
-        if not listing.location:
-            continue
-        payload.append(
-            {
-                "id": listing.id,
-                "title": listing.title,
-                "slug": listing.slug,
-                "lat": listing.location.y,
-                "lon": listing.location.x,
-                "price": str(listing.nightly_rate_usd),
-                "city": listing.city,
-            }
-        )
-    return JsonResponse({"results": payload})
+    # The geocode (possibly a remote call on its own thread) overlaps with form
+    # validation, which has to load the selected amenities.
+    _, geocoded = await asyncio.gather(sync_to_async(form.is_valid)(), ageocode_city(request.GET.get("q")))
+    return form, geocoded
+
+
+async def search_results(request):
+    form, geocoded = await _validate_and_geocode(request)
+    context = await _search_page_context(request, form, geocoded)
+    return await sync_to_async(render)(request, "search/results.html", context)
+
+
+async def htmx_results_partial(request):
+    form, geocoded = await _validate_and_geocode(request)
+    context = await _search_page_context(request, form, geocoded)
+    if request.GET.get("cursor"):
+        return await sync_to_async(render)(request, "partials/search_results_page.html", context)
+    return await sync_to_async(render)(request, "partials/search_results_list.html", context)
+
+
+async def htmx_map_payload(request):
+    form, geocoded = await _validate_and_geocode(request)
+    if not form.is_valid():
+        return JsonResponse(empty_map_payload())
+
+    try:
+        zoom = min(max(int(request.GET["zoom"]), 0), 22)
+    except (KeyError, ValueError):
+        zoom = None
+    payload = await sync_to_async(map_payload)(
+        form.cleaned_data,
+        bbox=parse_bbox(request.GET.get("bbox")),
+        zoom=zoom,
+        geocoded=geocoded,
+    )
+    return JsonResponse(payload)
+
+
+@cache_control(max_age=60)
+def htmx_location_suggestions(request):
+    suggestions = location_suggestions(request.GET.get("q"))
+    return render(request, "partials/location_suggestions.html", {"suggestions": suggestions})
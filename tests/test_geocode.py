@@ -0,0 +1,46 @@
+import pytest
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+
+from core.gazetteer import load_places, places_from_listings
+from core.geocode import UNAVAILABLE, GeocodeRateLimiter, geocode_city
+from core.models import Place
+from tests.factories import HostProfileFactory, ListingFactory
+
+
+@pytest.mark.django_db
+def test_gazetteer_seeded_from_listings_answers_without_remote_call(monkeypatch):
+    def no_network(*args, **kwargs):
+        raise AssertionError("remote geocoder should not be called")
+
+    monkeypatch.setattr("core.geocode.urlopen", no_network)
+    host = HostProfileFactory().user
+    ListingFactory(host=host, city="Austin", region="TX", location=Point(-97.70, 30.30, srid=4326))
+    ListingFactory(host=host, city="Austin", region="TX", location=Point(-97.80, 30.20, srid=4326))
+
+    load_places(places_from_listings(), source=Place.Source.LISTINGS, update_fields=["weight"])
+
+    assert geocode_city("  AUSTIN, tx ") == pytest.approx({"lat": 30.25, "lon": -97.75, "display_name": "Austin, TX"})
+    assert geocode_city("Austim")["lon"] == pytest.approx(-97.75)
+
+
+@pytest.mark.django_db
+def test_geocoder_failures_are_cached_and_trip_the_circuit_breaker(monkeypatch, settings):
+    settings.COVACH_GEOCODE_FAILURE_THRESHOLD = 2
+    calls = []
+
+    def failing(*args, **kwargs):
+        calls.append(args)
+        raise OSError("nominatim down")
+
+    monkeypatch.setattr("core.geocode.urlopen", failing)
+
+    for query in ["Nowhere A", "Nowhere B", "Nowhere C"]:
+        cache.delete(GeocodeRateLimiter.cache_key)
+        assert geocode_city(query) is UNAVAILABLE
+    assert len(calls) == 2
+
+    cache.delete("nominatim:open")
+    cache.delete(GeocodeRateLimiter.cache_key)
+    assert geocode_city("  nowhere   a ") is UNAVAILABLE
+    assert len(calls) == 2
@@ -0,0 +1,95 @@
+import datetime
+
+import pytest
+from django.utils import timezone
+
+from listings.ical import import_calendar
+from listings.models import AvailabilityBlock, AvailabilityRule, Listing
+from tests.factories import HostProfileFactory, ListingFactory
+
+FEED = """BEGIN:VCALENDAR\r
+VERSION:2.0\r
+BEGIN:VEVENT\r
+UID:keep@other\r
+DTSTART;VALUE=DATE:20300310\r
+DTEND;VALUE=DATE:20300312\r
+SUMMARY:Booked elsewhere\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:move@other\r
+DTSTART;VALUE=DATE:{move_start}\r
+DTEND;VALUE=DATE:{move_end}\r
+SUMMARY:Booked elsewhere\r
+END:VEVENT\r
+END:VCALENDAR\r
+"""
+
+
+@pytest.mark.django_db
+def test_ical_import_applies_only_changes_and_export_revalidates(client):
+    listing = ListingFactory(host=HostProfileFactory().user)
+    today = datetime.date(2030, 3, 1)
+    listing_blocks = AvailabilityBlock.objects.filter(listing=listing)
+
+    assert import_calendar(listing, FEED.format(move_start="20300320", move_end="20300322"), today=today) == (2, 0, 0)
+    assert import_calendar(listing, FEED.format(move_start="20300320", move_end="20300322"), today=today) == (0, 0, 0)
+    assert import_calendar(listing, FEED.format(move_start="20300321", move_end="20300324"), today=today) == (0, 1, 0)
+    assert listing_blocks.get(external_uid="move@other").start_date == datetime.date(2030, 3, 21)
+
+    only_first = FEED.split("BEGIN:VEVENT\r\nUID:move@other")[0] + "END:VCALENDAR\r\n"
+    assert import_calendar(listing, only_first, today=today) == (0, 0, 1)
+    assert list(listing_blocks.values_list("external_uid", flat=True)) == ["keep@other"]
+
+    response = client.get(f"/listings/ical/{listing.ical_token}.ics")
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/calendar")
+    assert "DTSTART;VALUE=DATE:20300310" in response.content.decode()
+
+    revalidated = client.get(f"/listings/ical/{listing.ical_token}.ics", HTTP_IF_NONE_MATCH=response["ETag"])
+    assert revalidated.status_code == 304
+
+
+@pytest.mark.django_db
+def test_ical_export_includes_rule_closed_nights(client):
+    listing = ListingFactory(host=HostProfileFactory().user)
+    today = datetime.date.today()
+    monday = today + datetime.timedelta(days=7 - today.weekday())
+    rule = AvailabilityRule.objects.create(
+        listing=listing, weekday_mask=0b1100000, start_date=monday, end_date=monday + datetime.timedelta(days=14)
+    )
+
+    body = client.get(f"/listings/ical/{listing.ical_token}.ics").content.decode()
+
+    saturday = monday + datetime.timedelta(days=5)
+    assert f"UID:rule-{rule.pk}-{saturday:%Y%m%d}@covach" in body
+    assert f"DTEND;VALUE=DATE:{saturday + datetime.timedelta(days=2):%Y%m%d}" in body
+    assert body.count("UID:rule-") == 2
+
+
+@pytest.mark.django_db
+def test_ical_feed_revalidates_to_a_fresh_body_the_next_day(client, monkeypatch):
+    listing = ListingFactory(host=HostProfileFactory().user)
+    today = timezone.localdate()
+    url = f"/listings/ical/{listing.ical_token}.ics"
+
+    response = client.get(url)
+    assert client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code == 304
+
+    monkeypatch.setattr(timezone, "localdate", lambda *args, **kwargs: today + datetime.timedelta(days=1))
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 200
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code == 200
+
+
+@pytest.mark.django_db
+def test_ical_feed_is_only_served_for_published_listings_by_token(client):
+    listing = ListingFactory(host=HostProfileFactory().user)
+
+    assert client.get(f"/listings/ical/{listing.ical_token}.ics").status_code == 200
+    assert client.get(f"/listings/{listing.pk}/calendar.ics").status_code == 404
+    assert client.get("/listings/ical/not-the-token.ics").status_code == 404
+
+    listing.status = Listing.Status.DRAFT
+    listing.save(update_fields=["status"])
+    assert client.get(f"/listings/ical/{listing.ical_token}.ics").status_code == 404
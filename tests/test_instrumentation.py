@@ -0,0 +1,18 @@
+import json
+import logging
+
+import pytest
+
+
+@pytest.mark.django_db
+def test_server_timing_header_and_log_line_when_enabled(client, settings, caplog):
+    settings.COVACH_SERVER_TIMING = True
+
+    with caplog.at_level(logging.INFO, logger="covach.timing"):
+        response = client.get("/search/")
+
+    assert "tpl;dur=" in response["Server-Timing"]
+    assert "total;dur=" in response["Server-Timing"]
+    line = json.loads(caplog.records[-1].getMessage())
+    assert line["view"] == "search.views.search_results"
+    assert line["status"] == 200
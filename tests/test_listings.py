@@ -0,0 +1,90 @@
+import datetime
+
+import pytest
+from django.core.exceptions import ValidationError
+
+from listings.blocks import block_dates, compact_blocks
+from listings.calendar import month_calendar
+from listings.models import AvailabilityBlock, AvailabilityRule, OccupiedNight
+from reservations.models import Reservation
+from reservations.services import ReservationError, create_request
+from tests.factories import HostProfileFactory, ListingFactory, ReservationFactory, UserFactory
+
+
+@pytest.mark.django_db
+def test_month_calendar_merges_adjacent_ranges_and_invalidates(django_capture_on_commit_callbacks):
+    listing = ListingFactory(host=HostProfileFactory().user)
+    month = datetime.date(2030, 3, 1)
+    AvailabilityBlock.objects.create(listing=listing, start_date=datetime.date(2030, 2, 26), end_date=datetime.date(2030, 3, 3))
+    AvailabilityBlock.objects.create(listing=listing, start_date=datetime.date(2030, 3, 3), end_date=datetime.date(2030, 3, 5))
+    ReservationFactory(
+        listing=listing,
+        status=Reservation.Status.APPROVED,
+        check_in=datetime.date(2030, 3, 4),
+        check_out=datetime.date(2030, 3, 7),
+    )
+
+    calendar = month_calendar(listing.pk, month)
+    assert calendar["unavailable"] == [["2030-03-01", "2030-03-07"]]
+    assert calendar["days"] == "1" * 6 + "0" * 25
+
+    with django_capture_on_commit_callbacks(execute=True):
+        AvailabilityBlock.objects.create(listing=listing, start_date=datetime.date(2030, 3, 30), end_date=datetime.date(2030, 4, 2))
+    assert month_calendar(listing.pk, month)["unavailable"][-1] == ["2030-03-30", "2030-04-01"]
+
+
+@pytest.mark.django_db
+def test_block_dates_coalesces_with_existing_blocks():
+    listing = ListingFactory(host=HostProfileFactory().user)
+    day = datetime.date.today() + datetime.timedelta(days=10)
+
+    def span(start, end):
+        return day + datetime.timedelta(days=start), day + datetime.timedelta(days=end)
+
+    for start, end in [(0, 1), (1, 2), (5, 7)]:
+        AvailabilityBlock.objects.create(listing=listing, start_date=span(start, end)[0], end_date=span(start, end)[1], reason="Repairs")
+    assert compact_blocks() == (1, 1, 2)
+
+    assert block_dates(listing, [span(2, 3), span(4, 5), span(20, 21)], reason="Family") == (3, 2)
+    assert block_dates(listing, [span(0, 1)]) == (0, 0)
+
+    blocks = list(AvailabilityBlock.objects.filter(listing=listing).values_list("start_date", "end_date", "reason"))
+    assert blocks == [(*span(0, 3), "Repairs; Family"), (*span(4, 7), "Family; Repairs"), (*span(20, 21), "Family")]
+    assert OccupiedNight.objects.filter(listing=listing).count() == 7
+
+
+@pytest.mark.django_db
+def test_weekend_rule_closes_nights_without_block_rows():
+    listing = ListingFactory(host=HostProfileFactory().user)
+    today = datetime.date.today()
+    monday = today + datetime.timedelta(days=14 - today.weekday())
+    open_saturday = monday + datetime.timedelta(days=12)
+    AvailabilityRule.objects.create(listing=listing, weekday_mask=0b1100000, start_date=monday, exclusions=[open_saturday])
+
+    def book(start, nights):
+        check_in = monday + datetime.timedelta(days=start)
+        return create_request(
+            guest=UserFactory(), listing=listing, check_in=check_in, check_out=check_in + datetime.timedelta(days=nights), guests=1
+        )
+
+    with pytest.raises(ReservationError):
+        book(3, 3)
+    assert book(0, 5).status == Reservation.Status.REQUESTED
+    assert book(12, 1).status == Reservation.Status.REQUESTED
+
+    weekend = [monday + datetime.timedelta(days=5), monday + datetime.timedelta(days=6), monday + datetime.timedelta(days=13)]
+    assert set(weekend) <= set(OccupiedNight.objects.filter(listing=listing).values_list("night", flat=True))
+    assert not OccupiedNight.objects.filter(listing=listing, night=open_saturday).exists()
+    assert not AvailabilityBlock.objects.filter(listing=listing).exists()
+
+
+@pytest.mark.django_db
+def test_reversed_block_and_rule_dates_fail_validation_instead_of_the_insert():
+    listing = ListingFactory(host=HostProfileFactory().user)
+    day = datetime.date(2030, 3, 10)
+
+    with pytest.raises(ValidationError):
+        AvailabilityBlock(listing=listing, start_date=day, end_date=day - datetime.timedelta(days=1)).full_clean()
+    with pytest.raises(ValidationError):
+        AvailabilityRule(listing=listing, weekday_mask=1, start_date=day, end_date=day).full_clean()
+    AvailabilityRule(listing=listing, weekday_mask=1, start_date=day).full_clean()
@@ -1,11 +1,25 @@
 import datetime
+import threading
+import time
 
 import pytest
+from django.db import IntegrityError, OperationalError, connection, transaction
 
 from accounts.models import HostProfile
+from listings.models import OccupiedNight
+from listings.occupancy import verify_occupancy
 from notifications.models import UserNotification
-from reservations.models import Reservation
-from reservations.services import ReservationError, approve_request, create_request
+from reservations.models import Reservation, ReservationEvent
+from reservations.scheduler import ExpiryScheduler
+from reservations.services import (
+    ReservationError,
+    approve_request,
+    approve_requests,
+    cancel_reservation,
+    create_request,
+    expire_open_requests,
+)
+from reservations.state_machine import transition
 from tests.factories import HostProfileFactory, ListingFactory, ReservationFactory, UserFactory
 
 
@@ -56,3 +70,229 @@ def test_approve_request_rejects_overlap():
     pending.refresh_from_db()
     assert existing.status == Reservation.Status.APPROVED
     assert pending.status == Reservation.Status.REQUESTED
+
+
+@pytest.mark.django_db
+def test_database_rejects_overlapping_approved_stays():
+    listing = ListingFactory(host=HostProfileFactory().user)
+    check_in = datetime.date.today() + datetime.timedelta(days=8)
+    ReservationFactory(
+        listing=listing,
+        status=Reservation.Status.APPROVED,
+        check_in=check_in,
+        check_out=check_in + datetime.timedelta(days=3),
+    )
+    # Back-to-back stays share no night and are fine.
+    ReservationFactory(
+        listing=listing,
+        status=Reservation.Status.APPROVED,
+        check_in=check_in + datetime.timedelta(days=3),
+        check_out=check_in + datetime.timedelta(days=5),
+    )
+
+    with pytest.raises(IntegrityError), transaction.atomic():
+        ReservationFactory(
+            listing=listing,
+            status=Reservation.Status.APPROVED,
+            check_in=check_in + datetime.timedelta(days=2),
+            check_out=check_in + datetime.timedelta(days=4),
+        )
+
+
+@pytest.mark.django_db
+def test_occupancy_calendar_follows_approved_reservations():
+    host_profile = HostProfileFactory()
+    listing = ListingFactory(host=host_profile.user)
+    reservation = ReservationFactory(listing=listing, host=listing.host, status=Reservation.Status.REQUESTED)
+    assert not OccupiedNight.objects.filter(listing=listing).exists()
+
+    approve_request(reservation_id=reservation.id, actor=listing.host)
+    assert OccupiedNight.objects.filter(listing=listing).count() == 3
+
+    cancel_reservation(reservation_id=reservation.id, actor=reservation.guest)
+    assert not OccupiedNight.objects.filter(listing=listing).exists()
+    assert verify_occupancy() == {}
+
+
+@pytest.mark.django_db
+def test_batch_approve_skips_requests_that_would_overlap(django_capture_on_commit_callbacks, mailoutbox):
+    listing = ListingFactory(host=HostProfileFactory().user)
+    check_in = datetime.date.today() + datetime.timedelta(days=8)
+    first = ReservationFactory(listing=listing, check_in=check_in, check_out=check_in + datetime.timedelta(days=3))
+    clashing = ReservationFactory(
+        listing=listing,
+        check_in=check_in + datetime.timedelta(days=1),
+        check_out=check_in + datetime.timedelta(days=4),
+    )
+    later = ReservationFactory(
+        listing=listing,
+        check_in=check_in + datetime.timedelta(days=10),
+        check_out=check_in + datetime.timedelta(days=12),
+    )
+    someone_elses = ReservationFactory()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        decided, skipped = approve_requests(
+            reservation_ids=[first.pk, clashing.pk, later.pk, someone_elses.pk],
+            actor=listing.host,
+        )
+
+    assert [reservation.pk for reservation in decided] == [first.pk, later.pk]
+    assert [reservation.pk for reservation in skipped] == [clashing.pk]
+    assert set(Reservation.objects.filter(status=Reservation.Status.APPROVED).values_list("pk", flat=True)) == {first.pk, later.pk}
+    assert ReservationEvent.objects.filter(event_type="request_approved").count() == 2
+    assert UserNotification.objects.filter(notification_type=UserNotification.NotificationType.RESERVATION_APPROVED).count() == 2
+    # Two approvals plus the automatic decline of the clashing request.
+    assert len(mailoutbox) == 3
+
+
+@pytest.mark.django_db
+def test_expire_open_requests_in_batches():
+    past = datetime.datetime.now(datetime.UTC) - datetime.timedelta(hours=1)
+    stale = [ReservationFactory(expires_at=past) for _ in range(3)]
+    fresh = ReservationFactory()
+    approved = ReservationFactory(status=Reservation.Status.APPROVED, expires_at=past)
+
+    assert expire_open_requests(batch_size=2) == 3
+
+    assert set(Reservation.objects.filter(status=Reservation.Status.EXPIRED).values_list("pk", flat=True)) == {
+        reservation.pk for reservation in stale
+    }
+    fresh.refresh_from_db()
+    approved.refresh_from_db()
+    assert fresh.status == Reservation.Status.REQUESTED
+    assert approved.status == Reservation.Status.APPROVED
+    assert ReservationEvent.objects.filter(event_type="request_expired").count() == 3
+    assert UserNotification.objects.filter(notification_type=UserNotification.NotificationType.RESERVATION_EXPIRED).count() == 3
+
+
+@pytest.mark.django_db
+def test_scheduler_expires_requests_once_their_deadline_passes():
+    now = datetime.datetime.now(datetime.UTC)
+    due = ReservationFactory(expires_at=now - datetime.timedelta(seconds=1))
+    soon = ReservationFactory(expires_at=now + datetime.timedelta(minutes=10))
+    ReservationFactory(expires_at=now + datetime.timedelta(days=2))
+
+    scheduler = ExpiryScheduler()
+    scheduler.refill()
+
+    assert [reservation_id for _, reservation_id in sorted(scheduler.deadlines)] == [due.pk, soon.pk]
+    assert scheduler.seconds_until_next() == 0
+    assert scheduler.expire_due() == 1
+    assert [reservation_id for _, reservation_id in scheduler.deadlines] == [soon.pk]
+    assert 0 < scheduler.seconds_until_next() <= scheduler.refill_seconds
+
+
+class _FakeNotify:
+    def __init__(self, payload):
+        self.payload = payload
+
+
+class _FakeListener:
+    def __init__(self, *payloads, error=None):
+        self.notifies = [_FakeNotify(payload) for payload in payloads]
+        self.error = error
+
+    def poll(self):
+        if self.error:
+            raise self.error
+
+
+def test_scheduler_queues_announced_deadlines_within_its_horizon(monkeypatch):
+    now = time.time()
+    monkeypatch.setattr(
+        connection,
+        "connection",
+        _FakeListener(f"1:{now + 60}", "garbage", "2:soon", f"3:{now + 7200}", f"4:{now + 30}"),
+    )
+    scheduler = ExpiryScheduler(horizon_seconds=3600)
+
+    scheduler.handle_notifications()
+
+    assert [reservation_id for _, reservation_id in sorted(scheduler.deadlines)] == [4, 1]
+    assert connection.connection.notifies == []
+
+
+def test_scheduler_reports_a_dropped_listener_connection_as_a_database_error(monkeypatch):
+    monkeypatch.setattr(connection, "connection", _FakeListener(error=connection.Database.OperationalError("server closed")))
+
+    with pytest.raises(OperationalError):
+        ExpiryScheduler().handle_notifications()
+
+
+@pytest.mark.django_db
+def test_approving_declines_competing_requests_in_bulk(client):
+    listing = ListingFactory(host=HostProfileFactory().user)
+    day = datetime.date.today() + datetime.timedelta(days=8)
+
+    def request(start, nights):
+        return ReservationFactory(
+            listing=listing,
+            check_in=day + datetime.timedelta(days=start),
+            check_out=day + datetime.timedelta(days=start + nights),
+        )
+
+    chosen = request(0, 3)
+    competing = [request(-1, 2), request(2, 2)]
+    back_to_back = request(3, 2)
+    far_off = request(20, 2)
+
+    client.force_login(listing.host)
+    inbox = client.get("/host/reservations/", {"status": "requested"})
+    flagged = {reservation.pk for reservation in inbox.context["reservations"] if reservation.has_conflict}
+    assert far_off.pk not in flagged
+    assert {chosen.pk, *(reservation.pk for reservation in competing)} <= flagged
+
+    approve_request(reservation_id=chosen.pk, actor=listing.host)
+
+    declined = Reservation.objects.filter(status=Reservation.Status.DECLINED).values_list("pk", flat=True)
+    assert set(declined) == {reservation.pk for reservation in competing}
+    back_to_back.refresh_from_db()
+    assert back_to_back.status == Reservation.Status.REQUESTED
+    events = ReservationEvent.objects.filter(event_type="request_declined", metadata__approved_reservation_id=chosen.pk)
+    assert events.count() == 2
+
+
+@pytest.mark.django_db
+def test_transition_rejects_a_stale_version():
+    listing = ListingFactory(host=HostProfileFactory().user)
+    reservation = ReservationFactory(listing=listing)
+    stale = Reservation.objects.get(pk=reservation.pk)
+
+    transition(reservation, Reservation.Status.DECLINED)
+    with pytest.raises(ReservationError):
+        transition(stale, Reservation.Status.APPROVED)
+
+    reservation.refresh_from_db()
+    assert reservation.status == Reservation.Status.DECLINED
+    assert reservation.version == 2
+    assert not OccupiedNight.objects.filter(listing=listing).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_overlapping_approvals_approve_one_and_reject_the_other():
+    listing = ListingFactory(host=HostProfileFactory().user)
+    first = ReservationFactory(listing=listing)
+    second = ReservationFactory(listing=listing, check_in=first.check_in + datetime.timedelta(days=1))
+    start = threading.Barrier(2)
+    outcomes = {}
+
+    def approve(reservation):
+        try:
+            start.wait()
+            approve_request(reservation_id=reservation.pk, actor=listing.host)
+            outcomes[reservation.pk] = "approved"
+        except ReservationError:
+            outcomes[reservation.pk] = "rejected"
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=approve, args=(reservation,)) for reservation in (first, second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(outcomes.values()) == ["approved", "rejected"]
+    statuses = dict(Reservation.objects.filter(listing=listing).values_list("pk", "status"))
+    assert sorted(statuses.values()) == [Reservation.Status.APPROVED, Reservation.Status.DECLINED]
@@ -1,9 +1,12 @@
 import datetime
 
 import pytest
+from django.contrib.gis.geos import Point
 
-from listings.models import AvailabilityBlock
+from core.geocode import UNAVAILABLE
+from listings.models import Amenity, AvailabilityBlock
 from reservations.models import Reservation
+from search.services import parse_bbox
 from tests.factories import HostProfileFactory, ListingFactory, ReservationFactory
 
 
@@ -44,3 +47,211 @@ def test_search_excludes_blocked_and_reserved(client):
     assert open_listing.title in content
     assert blocked_listing.title not in content
     assert reserved_listing.title not in content
+
+
+@pytest.mark.django_db
+def test_search_results_are_cursor_paginated(client, settings):
+    settings.COVACH_SEARCH_PAGE_SIZE = 2
+    host = HostProfileFactory().user
+    oldest, middle, newest = (ListingFactory(host=host) for _ in range(3))
+
+    response = client.get("/search/", {"guests": 1})
+    content = response.content.decode()
+    assert newest.title in content
+    assert middle.title in content
+    assert oldest.title not in content
+    assert "3 listings found" in content
+
+    next_query = response.context["next_query"]
+    assert "cursor=" in next_query
+
+    response = client.get(f"/hx/search/results/?{next_query}")
+    content = response.content.decode()
+    assert oldest.title in content
+    assert newest.title not in content
+    assert response.context["next_query"] is None
+
+
+@pytest.mark.django_db
+def test_search_page_embeds_map_pins_for_rendered_results(client):
+    listing = ListingFactory(host=HostProfileFactory().user, location=Point(-97.7431, 30.2672, srid=4326))
+
+    response = client.get("/search/", {"guests": 1})
+
+    assert [pin["slug"] for pin in response.context["pins"]] == [listing.slug]
+    assert '<script type="application/json">' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_cached_search_is_invalidated_when_dates_get_booked(client, django_capture_on_commit_callbacks):
+    host = HostProfileFactory().user
+    listing = ListingFactory(host=host)
+    check_in = datetime.date.today() + datetime.timedelta(days=30)
+    check_out = check_in + datetime.timedelta(days=2)
+    params = {"check_in": check_in.isoformat(), "check_out": check_out.isoformat()}
+
+    assert listing.title in client.get("/search/", params).content.decode()
+    assert listing.title in client.get("/search/", params).content.decode()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ReservationFactory(
+            listing=listing,
+            host=host,
+            status=Reservation.Status.APPROVED,
+            check_in=check_in,
+            check_out=check_out,
+        )
+
+    assert listing.title not in client.get("/search/", params).content.decode()
+
+
+@pytest.mark.django_db
+def test_map_payload_is_viewport_bounded_and_clustered_when_zoomed_out(client):
+    host = HostProfileFactory().user
+    downtown = ListingFactory(host=host, location=Point(-97.7431, 30.2672, srid=4326))
+    ListingFactory(host=host, location=Point(-97.7400, 30.2700, srid=4326))
+    ListingFactory(host=host, city="Seattle", location=Point(-122.3321, 47.6062, srid=4326))
+
+    response = client.get("/hx/search/map/", {"guests": 1, "bbox": "-98.0,30.0,-97.5,30.5", "zoom": 14})
+    payload = response.json()
+    assert payload["mode"] == "pins"
+    assert len(payload["id"]) == 2
+    assert downtown.id in payload["id"]
+
+    response = client.get("/hx/search/map/", {"guests": 1, "zoom": 3})
+    payload = response.json()
+    assert payload["mode"] == "clusters"
+    assert sorted(payload["count"]) == [1, 2]
+
+
+def test_parse_bbox_rejects_non_finite_edges():
+    assert parse_bbox("-98.0,30.0,-97.5,30.5") == (-98.0, 30.0, -97.5, 30.5)
+    assert parse_bbox("nan,30.0,-97.5,30.5") is None
+    assert parse_bbox("-98.0,30.0,inf,30.5") is None
+
+
+@pytest.mark.django_db
+def test_keyword_search_ranks_title_matches_first(client):
+    host = HostProfileFactory().user
+    description_match = ListingFactory(host=host, title="Quiet retreat", description="Steps from the lake")
+    title_match = ListingFactory(host=host, title="Lake cabin with hot tub")
+    ListingFactory(host=host, title="Downtown loft", description="City views")
+
+    response = client.get("/search/", {"keywords": "lake"})
+
+    assert [listing.pk for listing in response.context["listings"]] == [title_match.pk, description_match.pk]
+
+
+@pytest.mark.django_db
+def test_search_sorts_by_price_and_by_distance(client, monkeypatch):
+    async def fake_geocode(query):
+        return {"lat": 30.2672, "lon": -97.7431} if query else None
+
+    monkeypatch.setattr("search.views.ageocode_city", fake_geocode)
+    host = HostProfileFactory().user
+    far = ListingFactory(host=host, nightly_rate_usd=90, location=Point(-97.60, 30.40, srid=4326))
+    near = ListingFactory(host=host, nightly_rate_usd=200, location=Point(-97.7431, 30.2672, srid=4326))
+    middle = ListingFactory(host=host, nightly_rate_usd=150, location=Point(-97.70, 30.30, srid=4326))
+
+    response = client.get("/search/", {"guests": 1, "sort": "price_asc"})
+    assert [listing.pk for listing in response.context["listings"]] == [far.pk, middle.pk, near.pk]
+
+    response = client.get("/search/", {"q": "Austin", "sort": "distance"})
+    assert [listing.pk for listing in response.context["listings"]] == [near.pk, middle.pk, far.pk]
+
+
+@pytest.mark.django_db
+def test_amenity_filter_requires_every_selected_amenity(client):
+    wifi, pool = Amenity.objects.create(name="Wifi"), Amenity.objects.create(name="Pool")
+    host = HostProfileFactory().user
+    both = ListingFactory(host=host)
+    both.amenities.set([wifi, pool])
+    both.sync_amenity_ids()
+    wifi_only = ListingFactory(host=host)
+    wifi_only.amenities.set([wifi])
+    wifi_only.sync_amenity_ids()
+
+    response = client.get("/search/", {"amenities": [wifi.pk, pool.pk]})
+
+    assert [listing.pk for listing in response.context["listings"]] == [both.pk]
+
+
+# Facets are computed on a second connection, which only sees committed rows.
+@pytest.mark.django_db(transaction=True)
+def test_search_facets_count_within_current_filters(client):
+    wifi = Amenity.objects.create(name="Wifi")
+    host = HostProfileFactory().user
+    cabin = ListingFactory(host=host, property_type="cabin", bedrooms=2, nightly_rate_usd=80)
+    cabin.amenities.set([wifi])
+    cabin.sync_amenity_ids()
+    ListingFactory(host=host, property_type="villa", bedrooms=6, nightly_rate_usd=600)
+    ListingFactory(host=host, property_type="villa", bedrooms=5, nightly_rate_usd=900)
+
+    facets = client.get("/search/", {"guests": 1}).context["facets"]
+
+    assert {facet["value"]: facet["count"] for facet in facets["property_types"]}["villa"] == 2
+    assert {facet["value"]: facet["count"] for facet in facets["bedrooms"]} == {0: 0, 1: 0, 2: 1, 3: 0, 4: 2}
+    assert [bucket["count"] for bucket in facets["prices"]] == [0, 1, 0, 0, 0, 0, 2]
+    assert facets["amenities"] == [{"value": wifi.pk, "label": "Wifi", "count": 1}]
+
+    facets = client.get("/search/", {"max_price": 700}).context["facets"]
+
+    assert [bucket["count"] for bucket in facets["prices"]] == [0, 1, 0, 0, 0, 0, 1]
+
+
+@pytest.mark.django_db
+def test_location_autocomplete_ranks_prefix_matches_by_listing_count(client):
+    host = HostProfileFactory().user
+    ListingFactory(host=host, city="Austin", region="TX")
+    ListingFactory(host=host, city="Austin", region="TX")
+    ListingFactory(host=host, city="Aurora", region="CO")
+    ListingFactory(host=host, city="Denver", region="CO")
+
+    response = client.get("/hx/search/locations/", {"q": "AU"})
+
+    labels = [suggestion["label"] for suggestion in response.context["suggestions"]]
+    assert labels[:2] == ["Austin, TX", "Aurora, CO"]
+    assert "Denver, CO" not in labels
+
+
+@pytest.mark.django_db
+def test_flexible_dates_find_earliest_free_run_in_month(client):
+    host = HostProfileFactory().user
+    month = (datetime.date.today().replace(day=1) + datetime.timedelta(days=62)).replace(day=1)
+    gappy = ListingFactory(host=host)
+    # Free nights: the 1st-2nd (too short for three), then from the 6th on.
+    AvailabilityBlock.objects.create(listing=gappy, start_date=month.replace(day=3), end_date=month.replace(day=6))
+    full = ListingFactory(host=host)
+    AvailabilityBlock.objects.create(listing=full, start_date=month, end_date=month.replace(day=20))
+    ReservationFactory(
+        listing=full,
+        status=Reservation.Status.APPROVED,
+        check_in=month.replace(day=19),
+        check_out=month.replace(day=28) + datetime.timedelta(days=4),
+    )
+
+    response = client.get("/search/", {"month": month.strftime("%Y-%m"), "stay_nights": 3})
+
+    listings = response.context["listings"]
+    assert [listing.pk for listing in listings] == [gappy.pk]
+    assert listings[0].flexible_check_in == month.replace(day=6)
+
+    last_month = (datetime.date.today().replace(day=1) - datetime.timedelta(days=1)).strftime("%Y-%m")
+    response = client.get("/search/", {"month": last_month, "stay_nights": 3})
+    assert response.status_code == 200
+    assert response.context["form"].errors
+
+
+@pytest.mark.django_db
+def test_text_fallback_results_are_not_cached_while_geocoder_is_unavailable(client, monkeypatch):
+    async def unavailable(query):
+        return UNAVAILABLE
+
+    monkeypatch.setattr("search.views.ageocode_city", unavailable)
+    host = HostProfileFactory().user
+    ListingFactory(host=host, city="Austin")
+    assert len(client.get("/search/", {"q": "Austin"}).context["listings"]) == 1
+
+    # No on_commit bump happens inside the test transaction, so only an uncached search sees this.
+    ListingFactory(host=host, city="Austin")
+    assert len(client.get("/search/", {"q": "Austin"}).context["listings"]) == 2